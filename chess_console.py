@@ -1,36 +1,52 @@
 
-from enum import Enum
 from random import Random
-import os
+import asyncio
 import re
+import sys
 
-from chess_logic import ChessBoard, Colour, ChessRunner
+from chess_engine import ChessEngine
+from chess_logic import ChessBoard, ChessIO, ChessRunner, Colour, GameType
+from chess_mcts import MctsEngine
 
 
-def clear_console():
-    os.system('cls' if os.name == 'nt' else 'clear')
+# ANSI escape sequences: move the cursor to the top left, clear from the
+# cursor to the end of the screen, and move the cursor to (row, col).
+_CURSOR_HOME = '\x1b[H'
+_CLEAR_TO_END = '\x1b[J'
+_CURSOR_TO = '\x1b[{};{}H'
 
+# Screen row (1-based) below the board, where menus and prompts go
+_BELOW_BOARD_ROW = 11
 
-class GameType(Enum):
-    MULTI_PLAYER = 1
-    SINGLE_PLAYER = 2
+
+async def _run_blocking(func, *args):
+    """
+    Runs a blocking console call on the loop's default executor.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, func, *args)
 
 
 class ChessConsoleManager:
 
     def run(self):
         io = ChessConsoleIO()
-        runner = ChessRunner(io)
-        runner.run()
+        mcts_engine = MctsEngine()
+        runner = ChessRunner(io, engine=ChessEngine(),
+                             mcts_engine=mcts_engine)
+        try:
+            asyncio.run(runner.run())
+        finally:
+            mcts_engine.close()
 
 
-class ChessConsoleIO:
+class ChessConsoleIO(ChessIO):
 
     def __init__(self):
         self.__output = _ChessConsoleRenderer()
         self.__input = _ChessConsoleInput()
 
-    def get_menu_input(self, options):
+    async def get_menu_input(self, options):
         """
         Gets valid input for a menu given a list of options.
         :param options: List of tuples (integer value, option text).
@@ -38,22 +54,25 @@ class ChessConsoleIO:
         """
         self.__output.render_menu(options)
         valid_values = list(map(lambda opt: opt[0], options))
-        return self.__input.get_menu_input(valid_values)
+        return await _run_blocking(self.__input.get_menu_input, valid_values)
 
-    def get_move_input(self):
+    async def get_move_input(self):
         """
         Prompt user for input, validate format and return move coordinates.
         :return: A tuple of tuples with move coordinates
          ((old_x, old_y), (new_x, new_y))
         """
-        return self.__input.get_move_input()
+        return await _run_blocking(self.__input.get_move_input)
 
-    def render_board(self, board):
+    async def render_board(self, board):
         """
         Renders the chess board to the console.
         :param board: The board to render.
         """
-        pass
+        self.__output.render_board(board)
+
+    async def render_message(self, message):
+        self.__output.render_message(message)
 
     # def run(self):
     #     self.__print_menu_text()
@@ -126,19 +145,63 @@ class ChessConsoleIO:
 
 
 class _ChessConsoleRenderer(object):
+    """
+    Draws the board using ANSI escape sequences. The first frame of a board
+    is drawn in full, later frames only redraw the tiles that changed, and
+    every frame is sent with a single write.
+    """
+
+    def __init__(self):
+        self.__board = None
+        # Letters currently on screen, indexed [x][y] like the tiles
+        self.__drawn = None
 
     def render_board(self, board):
-        clear_console()
         tiles = board.get_tiles()
+        letters = [[self.__get_letter(tiles[x][y]) for y in range(0, 8)]
+                   for x in range(0, 8)]
+
+        if board is self.__board:
+            frame = self.__get_changed_tiles(letters)
+        else:
+            frame = self.__get_full_frame(letters)
+        self.__board = board
+        self.__drawn = letters
+
+        sys.stdout.write(frame)
+        sys.stdout.flush()
+
+    def __get_full_frame(self, letters):
+        lines = []
         for y in range(7, -1, -1):
-            line = str(y)
-            line += " |"
+            line = str(y + 1) + " |"
             for x in range(0, 8):
-                line += tiles[y][x].get_letter_representation() + "|"\
-                    if tiles[y][x] is not None \
-                    else " |"
+                line += letters[x][y] + "|"
+            lines.append(line)
+        lines.append("   a b c d e f g h")
+        return _CURSOR_HOME + _CLEAR_TO_END + '\n'.join(lines) + '\n\n'
 
-            print(line)
+    def __get_changed_tiles(self, letters):
+        parts = []
+        for y in range(7, -1, -1):
+            for x in range(0, 8):
+                if letters[x][y] != self.__drawn[x][y]:
+                    parts.append(_CURSOR_TO.format(8 - y, 4 + 2 * x))
+                    parts.append(letters[x][y])
+        # Park the cursor under the board and clear old prompts
+        parts.append(_CURSOR_TO.format(_BELOW_BOARD_ROW, 1))
+        parts.append(_CLEAR_TO_END)
+        return ''.join(parts)
+
+    def __get_letter(self, piece):
+        if piece is None:
+            return " "
+        letter = piece.get_letter_representation()
+        return letter if piece.colour is Colour.WHITE else letter.lower()
+
+    def render_message(self, message):
+        sys.stdout.write(message + '\n')
+        sys.stdout.flush()
 
     def render_menu(self, options):
         string_opts = map(lambda opt: str(opt[0]) + ') ' + opt[1], options)
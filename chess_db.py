@@ -0,0 +1,224 @@
+import argparse
+import os
+import sqlite3
+
+from chess_logic import NO_MOVE, ChessBoard, Colour
+from chess_pgn import map_batches, parse_san, read_games
+
+# Mixed into the board hash when black is to move, so the same pieces with
+# a different side to move are a different position
+_BLACK_TO_MOVE_KEY = 0x9D39247E33776D41
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    white TEXT,
+    black TEXT,
+    result TEXT,
+    UNIQUE (source, number));
+
+-- Clustered by position key, so all rows for a position are read together
+CREATE TABLE IF NOT EXISTS positions (
+    key INTEGER NOT NULL,
+    game_id INTEGER NOT NULL,
+    ply INTEGER NOT NULL,
+    move INTEGER,
+    PRIMARY KEY (key, game_id, ply)) WITHOUT ROWID;
+
+-- Games indexed so far from each source, for resuming a build
+CREATE TABLE IF NOT EXISTS progress (
+    source TEXT PRIMARY KEY,
+    games INTEGER NOT NULL);
+'''
+
+
+def get_position_key(board, colour):
+    """
+    Key a position is stored under: the board's Zobrist hash combined with
+    the side to move, as a signed 64 bit integer to suit SQLite.
+    """
+    key = board.hash
+    if colour is Colour.BLACK:
+        key ^= _BLACK_TO_MOVE_KEY
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+def index_game(san_moves):
+    """
+    Replays a game from the standard position.
+
+    :param san_moves: The moves played, in SAN, starting with white.
+    :return: List of tuples (position key, ply, packed move played next, or
+        'None' at the last position). Replay stops at the first move that
+        isn't legal, e.g. castling, which the board doesn't support.
+    """
+    board = ChessBoard()
+    colour = Colour.WHITE
+    rows = []
+    for ply, san in enumerate(san_moves):
+        move = parse_san(board, colour, san)
+        if move == NO_MOVE:
+            break
+        rows.append((get_position_key(board, colour), ply, move))
+        board.make_move(move)
+        colour = colour.opponent()
+    rows.append((get_position_key(board, colour), len(rows), None))
+    return rows
+
+
+def _index_games(games):
+    """
+    Replays a batch of games. Run in the workers.
+
+    :param games: List of tuples (tags, SAN moves, result).
+    :return: List of tuples (white, black, result, position rows).
+    """
+    return [(tags.get('White'), tags.get('Black'), result,
+             index_game(san_moves))
+            for tags, san_moves, result in games]
+
+
+class PositionIndex(object):
+    """
+    SQLite index from positions to the games and plies they occur in.
+
+    Building replays games on a process pool while this process alone
+    writes, one transaction per batch. A batch's progress is committed with
+    its rows, so an interrupted build picks up after the last batch
+    written.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Database file, created if missing.
+        """
+        self.__connection = sqlite3.connect(path)
+        self.__connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.__connection.close()
+
+    def build(self, source, stream, workers=None, batch_size=200):
+        """
+        Indexes every game in a PGN stream, skipping any already indexed
+        from the same source.
+
+        :param source: Name the stream is known by for resuming, e.g. its
+            file path.
+        :param stream: PGN text stream.
+        :param workers: Worker processes, one per CPU by default, 0 to
+            replay games in this process.
+        :param batch_size: Games replayed and written at a time.
+        :return: Number of games added.
+        """
+        done = self.get_indexed_count(source)
+        games = read_games(stream)
+        # Skip games written by an earlier, interrupted build
+        for _ in range(0, done):
+            if next(games, None) is None:
+                return 0
+
+        added = 0
+        # Batches are written in order, so progress always covers a prefix
+        # of the stream
+        for results in map_batches(_index_games, games, batch_size, workers):
+            self.__write_batch(source, done + added, results)
+            added += len(results)
+        return added
+
+    def __write_batch(self, source, first_number, results):
+        with self.__connection as connection:
+            cursor = connection.execute(
+                'SELECT COALESCE(MAX(id), 0) FROM games')
+            first_id = cursor.fetchone()[0] + 1
+            connection.executemany(
+                'INSERT INTO games (id, source, number, white, black, result) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(first_id + i, source, first_number + i, white, black, result)
+                 for i, (white, black, result, _) in enumerate(results)])
+            connection.executemany(
+                'INSERT OR IGNORE INTO positions (key, game_id, ply, move) '
+                'VALUES (?, ?, ?, ?)',
+                [(key, first_id + i, ply, move)
+                 for i, (_, _, _, rows) in enumerate(results)
+                 for key, ply, move in rows])
+            connection.execute(
+                'INSERT OR REPLACE INTO progress (source, games) '
+                'VALUES (?, ?)', (source, first_number + len(results)))
+
+    def get_indexed_count(self, source):
+        """
+        :return: Number of games indexed from source so far.
+        """
+        row = self.__connection.execute(
+            'SELECT games FROM progress WHERE source = ?',
+            (source,)).fetchone()
+        return row[0] if row is not None else 0
+
+    def find_games(self, board, colour, limit=None):
+        """
+        Finds the games reaching a position.
+
+        :param colour: The colour to move.
+        :param limit: Optional maximum number of results.
+        :return: List of tuples (game id, ply the position occurred at).
+        """
+        query = 'SELECT game_id, ply FROM positions WHERE key = ? ' \
+            'ORDER BY game_id, ply'
+        params = (get_position_key(board, colour),)
+        if limit is not None:
+            query += ' LIMIT ?'
+            params += (limit,)
+        return self.__connection.execute(query, params).fetchall()
+
+    def get_move_stats(self, board, colour):
+        """
+        Counts the moves played from a position and how those games ended.
+
+        :param colour: The colour to move.
+        :return: List of tuples (packed move, games, white wins, draws,
+            black wins), most played first.
+        """
+        return self.__connection.execute(
+            'SELECT p.move, COUNT(*), '
+            "SUM(g.result = '1-0'), SUM(g.result = '1/2-1/2'), "
+            "SUM(g.result = '0-1') "
+            'FROM positions p JOIN games g ON g.id = p.game_id '
+            'WHERE p.key = ? AND p.move IS NOT NULL '
+            'GROUP BY p.move ORDER BY COUNT(*) DESC, p.move',
+            (get_position_key(board, colour),)).fetchall()
+
+    def get_game(self, game_id):
+        """
+        :return: Tuple (white, black, result), or 'None' for an unknown id.
+        """
+        return self.__connection.execute(
+            'SELECT white, black, result FROM games WHERE id = ?',
+            (game_id,)).fetchone()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Index the positions in PGN files. Running again on '
+                    'the same files resumes where the last run stopped.')
+    parser.add_argument('database')
+    parser.add_argument('pgn', nargs='+')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=200)
+    args = parser.parse_args()
+
+    index = PositionIndex(args.database)
+    try:
+        for path in args.pgn:
+            with open(path) as stream:
+                added = index.build(os.path.abspath(path), stream,
+                                    args.workers, args.batch_size)
+            print('{}: {} games added'.format(path, added))
+    finally:
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+import threading
+import time
+
+from chess_eval import MAX_PHASE, PawnEntry, PawnHashTable
+from chess_logic import (
+    EN_PASSANT_FLAG, NO_MOVE, Bishop, Colour, King, Knight, Pawn, Queen,
+    Rook, get_move_from, get_move_promotion, get_move_to)
+
+PIECE_VALUES = {
+    Pawn: 100,
+    Knight: 320,
+    Bishop: 330,
+    Rook: 500,
+    Queen: 900,
+    King: 0}
+
+MATE_SCORE = 100000
+
+# Piece values for picking the least valuable attacker in an exchange. The
+# king goes last, and only when the other side has nothing left to recapture.
+_EXCHANGE_VALUES = dict(PIECE_VALUES)
+_EXCHANGE_VALUES[King] = MATE_SCORE
+
+
+def evaluate(board, colour, pawn_table=None):
+    """
+    Static evaluation of the position from colour's point of view: material
+    and piece-square values plus pawn structure and king shelter, blended
+    between middlegame and endgame scores by game phase.
+
+    :param pawn_table: Optional PawnHashTable to cache pawn structure in.
+    """
+    entry = _get_pawn_entry(board, pawn_table)
+    mg = (board.mg_score + entry.mg
+          + entry.get_shield(board.king_pos_dict[Colour.WHITE], True)
+          - entry.get_shield(board.king_pos_dict[Colour.BLACK], False))
+    eg = board.eg_score + entry.eg
+
+    phase = min(board.phase, MAX_PHASE)
+    score = (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+    return score if colour is Colour.WHITE else -score
+
+
+def _get_pawn_entry(board, pawn_table):
+    if pawn_table is not None:
+        entry = pawn_table.probe(board.pawn_hash)
+        if entry is not None:
+            return entry
+
+    entry = PawnEntry(
+        [pawn.pos for pawn in board.get_pieces(Colour.WHITE, Pawn)],
+        [pawn.pos for pawn in board.get_pieces(Colour.BLACK, Pawn)])
+    if pawn_table is not None:
+        pawn_table.store(board.pawn_hash, entry)
+    return entry
+
+
+class SearchLimits(object):
+    """
+    When a search should stop. Deadlines are time.monotonic() values and
+    are ignored while pondering. The fields may be changed while a search
+    runs, e.g. to start the clock when a ponder search becomes real.
+    """
+
+    def __init__(self, depth=None, soft_deadline=None, hard_deadline=None,
+                 pondering=False):
+        """
+        :param depth: Deepest iteration to search, unlimited if 'None'.
+        :param soft_deadline: No new iteration is started after this.
+        :param hard_deadline: The search is abandoned at this.
+        """
+        self.depth = depth
+        self.soft_deadline = soft_deadline
+        self.hard_deadline = hard_deadline
+        self.pondering = pondering
+        self.stop_event = threading.Event()
+
+    def is_hard_stop(self):
+        if self.stop_event.is_set():
+            return True
+        return (not self.pondering and self.hard_deadline is not None
+                and time.monotonic() >= self.hard_deadline)
+
+    def is_soft_stop(self):
+        if self.is_hard_stop():
+            return True
+        return (not self.pondering and self.soft_deadline is not None
+                and time.monotonic() >= self.soft_deadline)
+
+
+class ChessEngine(object):
+    """
+    Iterative deepening alpha-beta search with a captures-only quiescence
+    search.
+
+    The only state kept between calls is the pawn structure cache, which
+    is keyed by pawn hash and so is safe to share, meaning one instance can
+    serve several games at once from an executor.
+    """
+
+    def __init__(self, depth=2, pawn_table_size=16384):
+        self.depth = depth
+        self.pawn_table = PawnHashTable(pawn_table_size)
+
+    def choose_move(self, board, colour):
+        """
+        Searches the position to the engine's depth for colour's best move.
+
+        :return: The packed move, or NO_MOVE if colour has no legal moves.
+        """
+        return self.search(board, colour, SearchLimits(depth=self.depth))[0]
+
+    def search(self, board, colour, limits, on_info=None):
+        """
+        Searches one ply deeper at a time until the limits say stop. If an
+        iteration is cut short, the last completed one's result is used.
+
+        :param limits: SearchLimits, which may be changed from another
+            thread while the search runs.
+        :param on_info: Optional callback(depth, score, nodes, pv) after
+            each completed iteration, pv being a list of packed moves.
+        :return: Tuple (best move, expected reply), either of which may be
+            NO_MOVE.
+        """
+        return _Search(board, limits, self.pawn_table, on_info).run(colour)
+
+
+class _SearchAborted(Exception):
+    pass
+
+
+# Deepest iteration of an unlimited search
+_MAX_DEPTH = 64
+
+# Nodes searched between checks of the search limits
+_CHECK_INTERVAL = 128
+
+
+class _Search(object):
+    """
+    State for one search: the board being searched, node count and limits.
+    """
+
+    def __init__(self, board, limits, pawn_table, on_info):
+        self.__board = board
+        self.__limits = limits
+        self.__pawn_table = pawn_table
+        self.__on_info = on_info
+        self.nodes = 0
+
+    def run(self, colour):
+        root_moves = self.__board.get_legal_moves(colour)
+        if len(root_moves) == 0:
+            return NO_MOVE, NO_MOVE
+
+        best_pv = [_order_moves(self.__board, root_moves)[0]]
+        max_depth = self.__limits.depth or _MAX_DEPTH
+        for depth in range(1, max_depth + 1):
+            try:
+                score, pv = self.__search_root(
+                    colour, depth, root_moves, best_pv[0])
+            except _SearchAborted:
+                break
+            best_pv = pv
+            if self.__on_info is not None:
+                self.__on_info(depth, score, self.nodes, pv)
+            if abs(score) >= MATE_SCORE - _MAX_DEPTH:
+                # Forced mate found, searching deeper won't change the move
+                break
+            if self.__limits.is_soft_stop():
+                break
+
+        reply = best_pv[1] if len(best_pv) > 1 else NO_MOVE
+        return best_pv[0], reply
+
+    def __search_root(self, colour, depth, moves, first_move):
+        board = self.__board
+        alpha, beta = -MATE_SCORE - 1, MATE_SCORE + 1
+        best_pv = []
+        for move in _order_moves(board, moves, first_move):
+            child_pv = []
+            board.make_move(move)
+            try:
+                score = -self.__negamax(colour.opponent(), depth - 1,
+                                        -beta, -alpha, 1, child_pv)
+            finally:
+                board.unmake_move()
+            if len(best_pv) == 0 or score > alpha:
+                alpha = score
+                best_pv = [move] + child_pv
+        return alpha, best_pv
+
+    def __negamax(self, colour, depth, alpha, beta, ply, pv):
+        self.__count_node()
+        board = self.__board
+        moves = board.get_legal_moves(colour)
+        if len(moves) == 0:
+            # Prefer the quickest mate
+            return -(MATE_SCORE - ply) if board.is_in_check(colour) else 0
+        if depth <= 0:
+            return self.__quiesce(colour, alpha, beta, moves)
+
+        for move in _order_moves(board, moves):
+            child_pv = []
+            board.make_move(move)
+            try:
+                score = -self.__negamax(colour.opponent(), depth - 1,
+                                        -beta, -alpha, ply + 1, child_pv)
+            finally:
+                board.unmake_move()
+            if score >= beta:
+                return beta
+            if score > alpha:
+                alpha = score
+                pv[:] = [move] + child_pv
+        return alpha
+
+    def __quiesce(self, colour, alpha, beta, moves=None):
+        self.__count_node()
+        board = self.__board
+        stand_pat = evaluate(board, colour, self.__pawn_table)
+        if stand_pat >= beta:
+            return beta
+        alpha = max(alpha, stand_pat)
+
+        if moves is None:
+            moves = board.get_legal_moves(colour)
+        # Captures losing material can't raise alpha over stand pat
+        captures = [move for move in moves if _is_capture(board, move)
+                    and not _is_losing_capture(board, move)]
+        for move in _order_moves(board, captures):
+            board.make_move(move)
+            try:
+                score = -self.__quiesce(colour.opponent(), -beta, -alpha)
+            finally:
+                board.unmake_move()
+            if score >= beta:
+                return beta
+            alpha = max(alpha, score)
+        return alpha
+
+    def __count_node(self):
+        self.nodes += 1
+        if (self.nodes % _CHECK_INTERVAL == 0
+                and self.__limits.is_hard_stop()):
+            raise _SearchAborted()
+
+
+def _is_capture(board, move):
+    x, y = get_move_to(move)
+    return move & EN_PASSANT_FLAG or board.get_tiles()[x][y] is not None
+
+
+def static_exchange(board, move):
+    """
+    Static exchange evaluation: the material the side making a capture
+    expects to win once both sides have made every profitable recapture on
+    the target square, lowest value piece first. Sliders lined up behind
+    the capturing pieces join in as the pieces in front are traded off.
+    Pins are ignored and the board is not changed.
+
+    :param move: Packed capture.
+    :return: Material gained, negative for a losing capture.
+    """
+    tiles = board.get_tiles()
+    old_pos, new_pos = get_move_from(move), get_move_to(move)
+    attacker = tiles[old_pos[0]][old_pos[1]]
+    traded = {old_pos}
+    if move & EN_PASSANT_FLAG:
+        gains = [PIECE_VALUES[Pawn]]
+        traded.add((new_pos[0], old_pos[1]))
+    else:
+        victim = tiles[new_pos[0]][new_pos[1]]
+        gains = [PIECE_VALUES[type(victim)] if victim is not None else 0]
+
+    # Value of the piece now standing on the target square
+    on_square = _EXCHANGE_VALUES[type(attacker)]
+    promotion = get_move_promotion(move)
+    if promotion is not None:
+        gains[0] += PIECE_VALUES[promotion] - PIECE_VALUES[Pawn]
+        on_square = PIECE_VALUES[promotion]
+
+    colour = attacker.colour.opponent()
+    while True:
+        attackers = board.get_attackers(new_pos, colour, traded)
+        if len(attackers) == 0:
+            break
+        attacker = min(attackers,
+                       key=lambda piece: _EXCHANGE_VALUES[type(piece)])
+        if (type(attacker) is King and len(board.get_attackers(
+                new_pos, colour.opponent(), traded | {attacker.pos})) > 0):
+            # The king can't capture onto a defended square
+            break
+        gains.append(on_square - gains[-1])
+        on_square = _EXCHANGE_VALUES[type(attacker)]
+        traded.add(attacker.pos)
+        colour = colour.opponent()
+
+    # Either side may stop capturing when going on would lose material
+    for i in range(len(gains) - 1, 0, -1):
+        gains[i - 1] = -max(-gains[i - 1], gains[i])
+    return gains[0]
+
+
+def _is_losing_capture(board, move):
+    tiles = board.get_tiles()
+    (x0, y0), (x1, y1) = get_move_from(move), get_move_to(move)
+    victim = tiles[x1][y1]
+    victim_value = PIECE_VALUES[type(victim)] if victim is not None \
+        else PIECE_VALUES[Pawn]
+    # Taking a piece worth at least the attacker can't lose material, so
+    # the exchange only needs resolving for the rest
+    if victim_value >= PIECE_VALUES[type(tiles[x0][y0])]:
+        return False
+    return static_exchange(board, move) < 0
+
+
+def _order_moves(board, moves, first_move=NO_MOVE):
+    """
+    first_move (e.g. the previous iteration's best), then captures not
+    losing material by most valuable victim, least valuable attacker, then
+    quiet moves, then losing captures, least losing first.
+    """
+    tiles = board.get_tiles()
+
+    def move_key(move):
+        if move == first_move:
+            return -MATE_SCORE
+        (x0, y0), (x1, y1) = get_move_from(move), get_move_to(move)
+        victim = tiles[x1][y1]
+        if victim is None:
+            return 0
+        attacker_value = PIECE_VALUES[type(tiles[x0][y0])]
+        if PIECE_VALUES[type(victim)] < attacker_value:
+            exchange = static_exchange(board, move)
+            if exchange < 0:
+                return -exchange
+        return -(10 * PIECE_VALUES[type(victim)] - attacker_value)
+
+    return sorted(moves, key=move_key)
@@ -0,0 +1,253 @@
+"""
+Evaluation tables and pawn structure scoring. Kept free of imports from
+chess_logic, which uses the tables to keep running totals on the board.
+"""
+
+# Game phase is the sum of these weights over all pieces on the board: 24
+# at the start of the game, falling towards 0 as pieces come off.
+MAX_PHASE = 24
+PHASE_WEIGHTS = {'P': 0, 'N': 1, 'B': 1, 'R': 2, 'Q': 4, 'K': 0}
+
+# (middlegame, endgame) material values
+MATERIAL = {
+    'P': (100, 120),
+    'N': (320, 300),
+    'B': (330, 320),
+    'R': (500, 520),
+    'Q': (900, 920),
+    'K': (0, 0)}
+
+# Piece-square tables from white's point of view, as the board is printed:
+# the first row is rank 8 and each row runs from the a to the h file.
+_PAWN_MG = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0]
+
+_PAWN_EG = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    80, 80, 80, 80, 80, 80, 80, 80,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    30, 30, 30, 30, 30, 30, 30, 30,
+    20, 20, 20, 20, 20, 20, 20, 20,
+    10, 10, 10, 10, 10, 10, 10, 10,
+    0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0]
+
+_KNIGHT = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50]
+
+_BISHOP = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20]
+
+_ROOK = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    0, 0, 0, 5, 5, 0, 0, 0]
+
+_QUEEN = [
+    -20, -10, -10, -5, -5, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 5, 5, 5, 0, -10,
+    -5, 0, 5, 5, 5, 5, 0, -5,
+    0, 0, 5, 5, 5, 5, 0, -5,
+    -10, 5, 5, 5, 5, 5, 0, -10,
+    -10, 0, 5, 0, 0, 0, 0, -10,
+    -20, -10, -10, -5, -5, -10, -10, -20]
+
+_KING_MG = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20]
+
+_KING_EG = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10, 0, 0, -10, -20, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -30, 0, 0, 0, 0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50]
+
+# (middlegame, endgame) piece-square tables
+_PIECE_SQUARE_TABLES = {
+    'P': (_PAWN_MG, _PAWN_EG),
+    'N': (_KNIGHT, _KNIGHT),
+    'B': (_BISHOP, _BISHOP),
+    'R': (_ROOK, _ROOK),
+    'Q': (_QUEEN, _QUEEN),
+    'K': (_KING_MG, _KING_EG)}
+
+
+def get_square_values(letter, is_white):
+    """
+    Gets a piece's material plus piece-square value on every square.
+
+    :param letter: Piece letter, e.g. 'N'.
+    :return: Tuple (middlegame, endgame) of 64-item lists indexed by
+        square, y * 8 + x with a1 = 0.
+    """
+    values = []
+    for material, table in zip(MATERIAL[letter],
+                               _PIECE_SQUARE_TABLES[letter]):
+        by_square = []
+        for sq in range(0, 64):
+            x, y = sq % 8, sq // 8
+            # Black's tables are white's mirrored top to bottom
+            row = 7 - y if is_white else y
+            by_square.append(material + table[row * 8 + x])
+        values.append(by_square)
+    return values[0], values[1]
+
+
+# Pawn structure terms, (middlegame, endgame)
+_DOUBLED_PENALTY = (10, 20)
+_ISOLATED_PENALTY = (10, 15)
+# Passed pawn bonus by ranks advanced from the pawn's start rank
+_PASSED_BONUS = [(0, 0), (5, 10), (10, 20), (20, 40), (35, 65), (60, 100)]
+# King shelter bonus for an own pawn one and two ranks in front of the
+# king, on the king's file or either side of it
+_SHIELD_BONUS = (10, 5)
+
+
+def evaluate_pawn_structure(white_pawns, black_pawns):
+    """
+    Scores doubled, isolated and passed pawns.
+
+    :param white_pawns: Positions (x, y) of white's pawns.
+    :return: Tuple (middlegame, endgame), white minus black.
+    """
+    mg, eg = 0, 0
+    for own, enemy, sign in [(white_pawns, black_pawns, 1),
+                             (black_pawns, white_pawns, -1)]:
+        files = [0] * 8
+        for x, _ in own:
+            files[x] += 1
+
+        for x, y in own:
+            if files[x] > 1:
+                mg -= sign * _DOUBLED_PENALTY[0]
+                eg -= sign * _DOUBLED_PENALTY[1]
+            if ((x == 0 or files[x - 1] == 0)
+                    and (x == 7 or files[x + 1] == 0)):
+                mg -= sign * _ISOLATED_PENALTY[0]
+                eg -= sign * _ISOLATED_PENALTY[1]
+            if _is_passed(x, y, enemy, sign):
+                advanced = y - 1 if sign == 1 else 6 - y
+                mg += sign * _PASSED_BONUS[advanced][0]
+                eg += sign * _PASSED_BONUS[advanced][1]
+    return mg, eg
+
+
+def _is_passed(x, y, enemy_pawns, direction):
+    for enemy_x, enemy_y in enemy_pawns:
+        if abs(enemy_x - x) <= 1 and (enemy_y - y) * direction > 0:
+            return False
+    return True
+
+
+def evaluate_pawn_shield(king_pos, own_pawns, is_white):
+    """
+    Middlegame bonus for own pawns standing in front of the king.
+    """
+    direction = 1 if is_white else -1
+    bonus = 0
+    for x, y in own_pawns:
+        ranks_ahead = (y - king_pos[1]) * direction
+        if abs(x - king_pos[0]) <= 1 and 1 <= ranks_ahead <= 2:
+            bonus += _SHIELD_BONUS[ranks_ahead - 1]
+    return bonus
+
+
+class PawnEntry(object):
+    """
+    Pawn structure evaluation for one set of pawns. King shelter depends on
+    the king square as well, so it is worked out per king square on demand
+    and kept with the entry.
+    """
+
+    def __init__(self, white_pawns, black_pawns):
+        self.__pawns = {True: white_pawns, False: black_pawns}
+        self.mg, self.eg = evaluate_pawn_structure(white_pawns, black_pawns)
+        self.__shields = {}
+
+    def get_shield(self, king_pos, is_white):
+        key = (king_pos, is_white)
+        shield = self.__shields.get(key)
+        if shield is None:
+            shield = evaluate_pawn_shield(
+                king_pos, self.__pawns[is_white], is_white)
+            self.__shields[key] = shield
+        return shield
+
+
+class PawnHashTable(object):
+    """
+    Fixed-size cache of PawnEntry objects keyed by pawn hash.
+
+    The table is direct-mapped: each key has exactly one slot
+    (key % size), and storing always replaces whatever was in that slot.
+    Memory is bounded by size, and the structures seen most recently, which
+    are the ones search keeps returning to, are the ones kept.
+    """
+
+    def __init__(self, size=16384):
+        self.__size = size
+        self.__slots = [None] * size
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, key):
+        """
+        :return: The PawnEntry stored for key, or 'None'.
+        """
+        # Key and entry are stored as one tuple so a reader never pairs a
+        # key with another key's entry
+        slot = self.__slots[key % self.__size]
+        if slot is not None and slot[0] == key:
+            self.hits += 1
+            return slot[1]
+        self.misses += 1
+        return None
+
+    def store(self, key, entry):
+        self.__slots[key % self.__size] = (key, entry)
+
+    def get_hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes > 0 else 0.0
+
+    def clear(self):
+        self.__slots = [None] * self.__size
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,215 @@
+"""
+Exports positions sampled from PGN games as NumPy arrays for training
+models. Needs numpy, which the rest of the game doesn't.
+"""
+from array import array
+from random import Random
+import argparse
+import os
+
+from chess_logic import NO_MOVE, ChessBoard, Colour, encode_board
+from chess_pgn import map_batches, parse_san, read_games
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PLANE_COUNT = 12
+
+# Game results as the score for white
+_RESULT_SCORES = {'1-0': 1, '0-1': -1, '1/2-1/2': 0}
+
+
+def get_feature_planes(codes):
+    """
+    Expands encoded boards into one 8x8 plane per colour and piece type,
+    white's pawn to king then black's, so a piece's plane is its code - 1.
+
+    :param codes: Concatenated encode_board outputs.
+    :return: numpy uint8 array of shape (boards, 12, 8, 8), indexed
+        [board, plane, y, x].
+    """
+    boards = numpy.frombuffer(codes, dtype=numpy.uint8).reshape(-1, 1, 8, 8)
+    plane_codes = numpy.arange(1, PLANE_COUNT + 1,
+                               dtype=numpy.uint8).reshape(1, -1, 1, 1)
+    return (boards == plane_codes).astype(numpy.uint8)
+
+
+def sample_game(san_moves, result, sample_rate=1.0, seed=0):
+    """
+    Replays a game from the standard position and picks positions from it.
+
+    :param san_moves: The moves played, in SAN, starting with white.
+    :param result: '1-0', '0-1' or '1/2-1/2'.
+    :param sample_rate: Chance each position is picked.
+    :param seed: Seeds which positions are picked.
+    :return: Tuple (encoded boards, packed moves played, sides to move with
+        0 for white and 1 for black, results for the side to move with 1
+        a win, 0 a draw and -1 a loss). Replay stops at the first move the
+        board can't play, e.g. castling.
+    """
+    codes = bytearray()
+    moves = array('H')
+    turns = array('b')
+    values = array('b')
+    white_score = _RESULT_SCORES[result]
+
+    rng = Random(seed)
+    board = ChessBoard()
+    colour = Colour.WHITE
+    for san in san_moves:
+        move = parse_san(board, colour, san)
+        if move == NO_MOVE:
+            break
+        if rng.random() < sample_rate:
+            codes += encode_board(board)
+            moves.append(move)
+            turns.append(0 if colour is Colour.WHITE else 1)
+            values.append(white_score if colour is Colour.WHITE
+                          else -white_score)
+        board.make_move(move)
+        colour = colour.opponent()
+    return bytes(codes), moves, turns, values
+
+
+def _sample_games(games, sample_rate):
+    """
+    Samples a batch of games. Run in the workers.
+
+    :param games: List of tuples (game number, SAN moves, result).
+    :return: Samples of the whole batch, as sample_game's.
+    """
+    codes = bytearray()
+    moves = array('H')
+    turns = array('b')
+    values = array('b')
+    for number, san_moves, result in games:
+        game = sample_game(san_moves, result, sample_rate, number)
+        codes += game[0]
+        moves.extend(game[1])
+        turns.extend(game[2])
+        values.extend(game[3])
+    return bytes(codes), moves, turns, values
+
+
+class ShardWriter(object):
+    """
+    Collects samples and writes them out as .npz files of exactly
+    shard_size positions each, apart from the last. Each file holds
+    'planes' (see get_feature_planes), 'moves' (packed moves), 'turns' and
+    'values'. Samples are kept in their compact encoded form until a shard
+    is written, so memory is bounded by the shard size.
+    """
+
+    def __init__(self, directory, shard_size=65536, prefix='positions',
+                 compress=False):
+        """
+        :param directory: Directory the shards are written to, created if
+            missing.
+        :param compress: Whether to write with numpy.savez_compressed.
+        """
+        if numpy is None:
+            raise ImportError('Exporting training data needs numpy')
+        os.makedirs(directory, exist_ok=True)
+        self.__directory = directory
+        self.__shard_size = shard_size
+        self.__prefix = prefix
+        self.__compress = compress
+        self.__clear()
+        self.paths = []
+        self.position_count = 0
+
+    def __clear(self):
+        self.__codes = bytearray()
+        self.__moves = array('H')
+        self.__turns = array('b')
+        self.__values = array('b')
+
+    def add(self, codes, moves, turns, values):
+        """
+        Adds samples, writing any shards they fill. Arguments are as
+        returned by sample_game.
+        """
+        self.__codes += codes
+        self.__moves.extend(moves)
+        self.__turns.extend(turns)
+        self.__values.extend(values)
+        while len(self.__moves) >= self.__shard_size:
+            self.__write(self.__shard_size)
+
+    def close(self):
+        """
+        Writes whatever is left as a final, smaller shard.
+        """
+        if len(self.__moves) > 0:
+            self.__write(len(self.__moves))
+
+    def __write(self, size):
+        path = os.path.join(self.__directory, '{}-{:05d}.npz'.format(
+            self.__prefix, len(self.paths)))
+        save = numpy.savez_compressed if self.__compress else numpy.savez
+        save(path,
+             planes=get_feature_planes(bytes(self.__codes[:size * 64])),
+             moves=numpy.array(self.__moves[:size], dtype=numpy.uint16),
+             turns=numpy.array(self.__turns[:size], dtype=numpy.int8),
+             values=numpy.array(self.__values[:size], dtype=numpy.int8))
+
+        codes, moves = self.__codes[size * 64:], self.__moves[size:]
+        turns, values = self.__turns[size:], self.__values[size:]
+        self.__clear()
+        self.__codes += codes
+        self.__moves.extend(moves)
+        self.__turns.extend(turns)
+        self.__values.extend(values)
+        self.paths.append(path)
+        self.position_count += size
+
+
+def export_games(stream, writer, sample_rate=1.0, workers=None,
+                 batch_size=200):
+    """
+    Samples positions from every finished game in a PGN stream. Games are
+    replayed in batches on a process pool, see map_batches.
+
+    :param writer: ShardWriter the samples go to. It is closed at the end.
+    :param sample_rate: Chance each position is picked. Which ones are
+        picked depends only on the game's position in the stream.
+    :param workers: Worker processes, one per CPU by default, 0 to replay
+        games in this process.
+    :return: Number of positions written.
+    """
+    games = ((number, san_moves, result)
+             for number, (_, san_moves, result)
+             in enumerate(read_games(stream))
+             if result in _RESULT_SCORES)
+    for samples in map_batches(_sample_games, games, batch_size, workers,
+                               (sample_rate,)):
+        writer.add(*samples)
+    writer.close()
+    return writer.position_count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Export positions from PGN files as NumPy shards.')
+    parser.add_argument('directory')
+    parser.add_argument('pgn', nargs='+')
+    parser.add_argument('--shard-size', type=int, default=65536)
+    parser.add_argument('--sample-rate', type=float, default=1.0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--compress', action='store_true')
+    args = parser.parse_args()
+
+    for i, path in enumerate(args.pgn):
+        writer = ShardWriter(args.directory, args.shard_size,
+                             'positions-{}'.format(i), args.compress)
+        with open(path) as stream:
+            count = export_games(stream, writer, args.sample_rate,
+                                 args.workers)
+        print('{}: {} positions in {} shards'.format(
+            path, count, len(writer.paths)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,352 @@
-import copy
+import asyncio
+import threading
 from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict
 from enum import Enum
+from random import Random
+
+from chess_eval import PHASE_WEIGHTS, get_square_values
 
 
 class Colour(Enum):
     WHITE = 1
     BLACK = 2
 
+    def opponent(self):
+        return Colour.BLACK if self is Colour.WHITE else Colour.WHITE
+
+
+_ORTHOGONAL_VECTORS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+_DIAGONAL_VECTORS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+_KNIGHT_VECTORS = ((1, 2), (-1, 2), (1, -2), (-1, -2),
+                   (2, 1), (2, -1), (-2, 1), (-2, -1))
+
+
+def _build_rays():
+    """
+    Precomputes, for every tile and direction, the tiles a slider passes
+    through in order until it leaves the board.
+    """
+    rays = {}
+    for x in range(0, 8):
+        for y in range(0, 8):
+            rays[(x, y)] = {}
+            for vector in _ORTHOGONAL_VECTORS + _DIAGONAL_VECTORS:
+                ray = []
+                cx, cy = x + vector[0], y + vector[1]
+                while 0 <= cx <= 7 and 0 <= cy <= 7:
+                    ray.append((cx, cy))
+                    cx, cy = cx + vector[0], cy + vector[1]
+                rays[(x, y)][vector] = tuple(ray)
+    return rays
+
+
+def _build_step_targets(vectors):
+    targets = {}
+    for x in range(0, 8):
+        for y in range(0, 8):
+            targets[(x, y)] = tuple(
+                (x + v[0], y + v[1]) for v in vectors
+                if 0 <= x + v[0] <= 7 and 0 <= y + v[1] <= 7)
+    return targets
+
+
+_RAYS = _build_rays()
+_KNIGHT_TARGETS = _build_step_targets(_KNIGHT_VECTORS)
+_KING_TARGETS = _build_step_targets(
+    _ORTHOGONAL_VECTORS + _DIAGONAL_VECTORS)
+
+
+# Moves are packed into 16 bits: bits 0-5 hold the from square and bits 6-11
+# the to square (square = y * 8 + x, so a1 = 0 and h8 = 63), bits 12-13 the
+# promotion piece, bit 14 marks a promotion and bit 15 an en passant capture.
+# Use encode_move/decode_move at the edges, e.g. for IO.
+NO_MOVE = 0
+PROMOTION_FLAG = 1 << 14
+EN_PASSANT_FLAG = 1 << 15
+_SQUARE_MASK = 0x3F
+_FROM_TO_MASK = 0xFFF
+
+_POSITIONS = tuple((sq % 8, sq // 8) for sq in range(0, 64))
+_SQUARES = dict((pos, sq) for sq, pos in enumerate(_POSITIONS))
+
+
+def encode_move(old_pos, new_pos, promotion=None, flags=0):
+    """
+    Packs a move into its 16 bit form.
+
+    :param promotion: Optional piece class a pawn promotes to.
+    :param flags: Extra flags, e.g. EN_PASSANT_FLAG.
+    """
+    move = _SQUARES[old_pos] | (_SQUARES[new_pos] << 6) | flags
+    if promotion is not None:
+        move |= PROMOTION_FLAG | (_PROMOTION_PIECES.index(promotion) << 12)
+    return move
+
+
+def decode_move(move):
+    """
+    :return: ((old_x, old_y), (new_x, new_y)) for a packed move.
+    """
+    return _POSITIONS[move & _SQUARE_MASK], \
+        _POSITIONS[(move >> 6) & _SQUARE_MASK]
+
+
+def get_move_from(move):
+    return _POSITIONS[move & _SQUARE_MASK]
+
+
+def get_move_to(move):
+    return _POSITIONS[(move >> 6) & _SQUARE_MASK]
+
+
+def get_move_promotion(move):
+    """
+    :return: The piece class promoted to, or 'None'.
+    """
+    if not move & PROMOTION_FLAG:
+        return None
+    return _PROMOTION_PIECES[(move >> 12) & 3]
+
+
+class CheckInfo(object):
+    """
+    Check and pin state for one side in one position.
+
+    checkers: positions of the enemy pieces giving check.
+    check_mask: tiles a non-king move must land on to resolve the check,
+        'None' when not in check and an empty set in double check.
+    pins: maps the position of each pinned piece to the tiles it may
+        still move to (the ray between king and pinner, inclusive).
+    """
+    def __init__(self, checkers, check_mask, pins):
+        self.checkers = checkers
+        self.check_mask = check_mask
+        self.pins = pins
+
+    def allows(self, old_pos, new_pos):
+        """
+        Whether a non-king move keeps the king safe.
+        """
+        if self.check_mask is not None and new_pos not in self.check_mask:
+            return False
+        pin_ray = self.pins.get(old_pos)
+        return pin_ray is None or new_pos in pin_ray
+
+
+class MoveCache(object):
+    """
+    Bounded least-recently-used cache of legal move lists.
+
+    Keys identify a position exactly (piece hash, side to move and any en
+    passant chance), so an entry can only ever be returned for the
+    position it was generated in and never needs invalidating. One cache
+    can be shared by many boards, and across threads.
+    """
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __reduce__(self):
+        # Caches are per process: a pickled board gets an empty cache
+        return MoveCache, (self.max_size,)
+
+    def get(self, key):
+        """
+        :return: A copy of the moves stored for key, or 'None'.
+        """
+        with self.__lock:
+            moves = self.__entries.get(key)
+            if moves is None:
+                self.misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+        return array('H', moves)
+
+    def put(self, key, moves):
+        with self.__lock:
+            self.__entries[key] = array('H', moves)
+            self.__entries.move_to_end(key)
+            if len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+
+    def get_hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+class GameType(Enum):
+    MULTI_PLAYER = 1
+    SINGLE_PLAYER = 2
+
+
+class ChessIO(ABC):
+    """
+    Asynchronous input/output used by ChessRunner. Implementations must not
+    block the event loop, so that many games can share one loop.
+    """
+
+    @abstractmethod
+    async def get_menu_input(self, options):
+        """
+        Gets valid input for a menu given a list of options.
+        :param options: List of tuples (integer value, option text).
+        :return: A valid menu integer.
+        """
+        pass
+
+    @abstractmethod
+    async def get_move_input(self):
+        """
+        Gets a move from the player.
+        :return: A tuple of tuples with move coordinates
+         ((old_x, old_y), (new_x, new_y))
+        """
+        pass
+
+    @abstractmethod
+    async def render_board(self, board):
+        """
+        Shows the board to the player.
+        :param board: The board to render.
+        """
+        pass
+
+    @abstractmethod
+    async def render_message(self, message):
+        """
+        Shows a line of text to the player.
+        """
+        pass
+
 
 class ChessRunner:
     """
     Manages the game, executing game loop and options, e.g. 'play again'
     or 'single player/multi-player'.
+
+    Games are coroutines, so one event loop can drive many runners at once.
+    Engine moves are computed in an executor (the loop's default thread
+    pool unless one is given, e.g. a ProcessPoolExecutor shared by all
+    runners) so a slow search never stalls the other games.
     """
-    def __init__(self, io):
+    def __init__(self, io, engine=None, executor=None, mcts_engine=None):
+        """
+        :param engine: Engine for single player, with a
+            choose_move(board, colour) method.
+        :param mcts_engine: Optional second engine offered alongside
+            engine, e.g. chess_mcts.MctsEngine.
+        """
         self.__io = io
+        self.__engine = engine
+        self.__executor = executor
+        self.__mcts_engine = mcts_engine
+
+    async def run(self):
+        while True:
+            options = [(GameType.MULTI_PLAYER.value, 'With a friend')]
+            if self.__engine is not None:
+                options.append(
+                    (GameType.SINGLE_PLAYER.value, 'Against the computer'))
+            game_type = GameType(await self.__io.get_menu_input(options))
+
+            engine = self.__engine
+            if (game_type is GameType.SINGLE_PLAYER
+                    and self.__mcts_engine is not None):
+                selected = await self.__io.get_menu_input(
+                    [(1, 'Alpha-beta search'),
+                     (2, 'Monte Carlo tree search')])
+                if selected == 2:
+                    engine = self.__mcts_engine
+            await self.play_game(game_type, engine=engine)
+
+            selected = await self.__io.get_menu_input(
+                [(1, 'Play again'), (2, 'Quit')])
+            if selected == 2:
+                return
+
+    async def play_game(self, game_type, human_colour=Colour.WHITE,
+                        engine=None):
+        """
+        Plays one game to completion.
 
-    def run(self):
-        pass
+        :param human_colour: The colour the human plays in single player.
+        :param engine: Engine to play against in single player, the
+            runner's engine by default.
+        :return: The winning Colour, or 'None' for a stalemate.
+        """
+        engine = engine if engine is not None else self.__engine
+        board = ChessBoard()
+        colour = Colour.WHITE
+        await self.__io.render_board(board)
+
+        while len(board.get_legal_moves(colour)) > 0:
+            if (game_type is GameType.SINGLE_PLAYER
+                    and colour is not human_colour):
+                move = await self.__get_engine_move(engine, board, colour)
+            else:
+                move = await self.__get_human_move(board, colour)
+            board.make_move(move)
+            await self.__io.render_board(board)
+            colour = colour.opponent()
+
+        if board.is_in_check(colour):
+            winner = colour.opponent()
+            await self.__io.render_message(
+                'Checkmate, {} wins.'.format(winner.name.lower()))
+            return winner
+        await self.__io.render_message('Stalemate.')
+        return None
+
+    async def __get_human_move(self, board, colour):
+        move = self.__find_move(
+            board, colour, await self.__io.get_move_input())
+        while move == NO_MOVE:
+            await self.__io.render_message('Invalid move')
+            move = self.__find_move(
+                board, colour, await self.__io.get_move_input())
+        return move
+
+    def __find_move(self, board, colour, coords):
+        old_pos, new_pos = coords
+        piece = board.get_tiles()[old_pos[0]][old_pos[1]]
+        if piece is None or piece.colour is not colour:
+            return NO_MOVE
+        return board.find_move(old_pos, new_pos)
+
+    async def __get_engine_move(self, engine, board, colour):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.__executor, engine.choose_move, board, colour)
 
 
 class ChessBoard(object):
 
     def __init__(self, **kwargs):
+        """
+        :param layout: 'blank' for an empty board, else the standard layout.
+        :param move_cache: Optional MoveCache for get_legal_moves to use.
+        """
 
-        self.move_list = []
+        # Packed moves played so far, see encode_move
+        self.move_list = array('H')
 
-        # (row,col) with (0,0) in the top left.
+        # (x,y) with x the file and y the rank, (0,0) being a1.
         self.__tiles = []
 
         for i in range(0, 8):
@@ -34,81 +354,412 @@ class ChessBoard(object):
             for j in range(0, 8):
                 self.__tiles[i].append(None)
 
+        # Pieces on the board indexed by colour, then piece type, then
+        # position, so whole-board queries only touch occupied squares.
+        self.__pieces = {Colour.WHITE: {}, Colour.BLACK: {}}
+
+        # CheckInfo per colour for the current position, dropped whenever
+        # a piece is added or removed.
+        self.__check_info = {}
+
+        # What make_move changed, so unmake_move can restore it
+        self.__undo_stack = []
+
+        # Running evaluation terms, white minus black, kept up to date by
+        # add_piece and remove_piece so evaluating a position never has to
+        # rescan the tiles. phase is the sum of the pieces' phase weights.
+        self.mg_score = 0
+        self.eg_score = 0
+        self.phase = 0
+
+        # Zobrist hash of every piece on the board, and of the pawns alone
+        # for caching pawn structure evaluation.
+        self.hash = 0
+        self.pawn_hash = 0
+
+        self.__move_cache = kwargs.get('move_cache', None)
+
+        self.king_pos_dict = {
+            Colour.WHITE: (-1, -1),
+            Colour.BLACK: (-1, -1)}
+
         # Blank board for unit testing
         if kwargs.get('layout', None) == 'blank':
-            self.king_pos_dict = {
-                Colour.WHITE: (-1, -1),
-                Colour.BLACK: (-1, -1)}
             return
 
         # Standard new board
-        self.__add_main_pieces(0, Colour.BLACK)
-        self.__add_main_pieces(7, Colour.WHITE)
+        self.__add_main_pieces(0, Colour.WHITE)
+        self.__add_main_pieces(7, Colour.BLACK)
         self.__add_pawns()
-        self.white_king_pos = (4, 0)
-        self.black_king_pos = (4, 7)
 
     def get_tiles(self):
         return self.__tiles
 
-    def move_piece(self, old_pos, new_pos):
+    def get_pieces(self, colour, piece_type=None):
+        """
+        Gets the pieces of a colour currently on the board.
+
+        :param piece_type: Optional piece class to restrict the result to.
+        :return: List of ChessPiece objects.
+        """
+        index = self.__pieces[colour]
+        if piece_type is not None:
+            return list(index.get(piece_type, {}).values())
+        return [piece for by_pos in index.values()
+                for piece in by_pos.values()]
+
+    def add_piece(self, piece):
+        """
+        Places a piece on the board at its current position, replacing
+        whatever was on that tile.
+        """
+        x, y = piece.pos
+        if self.__tiles[x][y] is not None:
+            self.remove_piece(piece.pos)
+        self.__check_info.clear()
+        self.__tiles[x][y] = piece
+        self.__pieces[piece.colour].setdefault(
+            type(piece), {})[piece.pos] = piece
+        self.__update_king_dict(piece)
+
+        mg, eg, phase = _SQUARE_VALUES[piece.colour][type(piece)]
+        sq = y * 8 + x
+        self.mg_score += mg[sq]
+        self.eg_score += eg[sq]
+        self.phase += phase
+        key = _ZOBRIST_KEYS[piece.colour][type(piece)][sq]
+        self.hash ^= key
+        if type(piece) is Pawn:
+            self.pawn_hash ^= key
+
+    def remove_piece(self, pos):
+        """
+        Removes the piece at pos from the board.
+
+        :return: The removed piece, or 'None' if the tile was empty.
+        """
+        piece = self.__tiles[pos[0]][pos[1]]
+        if piece is not None:
+            self.__check_info.clear()
+            self.__tiles[pos[0]][pos[1]] = None
+            del self.__pieces[piece.colour][type(piece)][pos]
+
+            mg, eg, phase = _SQUARE_VALUES[piece.colour][type(piece)]
+            sq = pos[1] * 8 + pos[0]
+            self.mg_score -= mg[sq]
+            self.eg_score -= eg[sq]
+            self.phase -= phase
+            key = _ZOBRIST_KEYS[piece.colour][type(piece)][sq]
+            self.hash ^= key
+            if type(piece) is Pawn:
+                self.pawn_hash ^= key
+        return piece
+
+    def move_piece(self, old_pos, new_pos, promotion=None):
         """
         Move piece to the designated new_pos, provided it is a valid move.
 
+        :param promotion: Piece class a pawn promotes to, queen by default.
         :returns: 'True' if piece successfully moved, else 'False'.
         """
-        piece = self.__tiles[old_pos[0]][old_pos[1]]
-        if piece is None:
+        move = self.find_move(old_pos, new_pos, promotion)
+        if move == NO_MOVE:
             return False
+        self.make_move(move)
+        return True
 
-        if new_pos in piece.get_moves(self, prev_move=self.get_last_move()):
-            self.__tiles[old_pos[0]][old_pos[1]] = None
-            self.__tiles[new_pos[0]][new_pos[1]] = piece
-            piece.pos = new_pos
-            self.__update_king_dict(piece)
-            return True
-        return False
+    def find_move(self, old_pos, new_pos, promotion=None):
+        """
+        Looks up the legal move taking the piece on old_pos to new_pos.
+
+        :param promotion: Piece class a pawn promotes to, queen by default.
+        :return: The packed move, or NO_MOVE if there is no such legal move.
+        """
+        piece = self.__tiles[old_pos[0]][old_pos[1]]
+        if piece is None:
+            return NO_MOVE
+
+        from_to = _SQUARES[old_pos] | (_SQUARES[new_pos] << 6)
+        promotion = Queen if promotion is None else promotion
+        for move in self.get_legal_moves(piece.colour):
+            if ((move & _FROM_TO_MASK) == from_to
+                    and (not move & PROMOTION_FLAG
+                         or get_move_promotion(move) is promotion)):
+                return move
+        return NO_MOVE
+
+    def make_move(self, move):
+        """
+        Plays a packed move without checking it is legal, handling
+        captures, en passant and promotion. Use unmake_move to take it
+        back.
+        """
+        old_pos = _POSITIONS[move & _SQUARE_MASK]
+        new_pos = _POSITIONS[(move >> 6) & _SQUARE_MASK]
+        piece = self.remove_piece(old_pos)
+        if move & EN_PASSANT_FLAG:
+            captured = self.remove_piece((new_pos[0], old_pos[1]))
+        else:
+            captured = self.remove_piece(new_pos)
+
+        promoted = None
+        if move & PROMOTION_FLAG:
+            promoted = piece
+            piece = get_move_promotion(move)(new_pos, piece.colour)
+
+        piece.pos = new_pos
+        self.add_piece(piece)
+        self.move_list.append(move)
+        self.__undo_stack.append((piece, old_pos, captured, promoted))
+
+    def unmake_move(self):
+        """
+        Takes back the last move played with make_move.
+        """
+        piece, old_pos, captured, promoted = self.__undo_stack.pop()
+        self.move_list.pop()
+        self.remove_piece(piece.pos)
+        if promoted is not None:
+            piece = promoted
+        piece.pos = old_pos
+        self.add_piece(piece)
+        if captured is not None:
+            self.add_piece(captured)
 
     def get_last_move(self):
-        return (-1, -1) if len(self.move_list) == 0 else self.move_list[-1]
+        return NO_MOVE if len(self.move_list) == 0 else self.move_list[-1]
 
     def __add_main_pieces(self, row, team):
-        self.__add_piece('Rook', (row, 0), team)
-        self.__add_piece('Rook', (row, 7), team)
-        self.__add_piece('Knight', (row, 1), team)
-        self.__add_piece('Knight', (row, 6), team)
-        self.__add_piece('Bishop', (row, 2), team)
-        self.__add_piece('Bishop', (row, 5), team)
-        self.__add_piece('Queen', (row, 3), team)
-        self.__add_piece('King', (row, 4), team)
+        self.__add_piece('Rook', (0, row), team)
+        self.__add_piece('Rook', (7, row), team)
+        self.__add_piece('Knight', (1, row), team)
+        self.__add_piece('Knight', (6, row), team)
+        self.__add_piece('Bishop', (2, row), team)
+        self.__add_piece('Bishop', (5, row), team)
+        self.__add_piece('Queen', (3, row), team)
+        self.__add_piece('King', (4, row), team)
 
     def __add_pawns(self):
         for col in range(0, 8):
-            self.__add_piece('Pawn', (1, col), Colour.BLACK)
-            self.__add_piece('Pawn', (6, col), Colour.WHITE)
+            self.__add_piece('Pawn', (col, 6), Colour.BLACK)
+            self.__add_piece('Pawn', (col, 1), Colour.WHITE)
 
     def __add_piece(self, class_name, pos, team):
         piece_class = globals()[class_name]
-        piece = piece_class(pos, team)
-        self.__tiles[pos[0]][pos[1]] = piece
+        self.add_piece(piece_class(pos, team))
 
     def is_in_check(self, colour):
-        king_pos = self.king_pos_dict[colour]
-        for x in range(0, 8):
-            for y in range(0, 8):
-                piece = self.__tiles[x][y]
-                if piece is not None and piece.colour is not colour:
-                    # prev_move not required for this method
-                    moves = piece.get_moves(self,
-                                            prev_move=((-1, -1), (-1, -1)))
-                    if king_pos in moves:
+        return len(self.get_check_info(colour).checkers) > 0
+
+    def is_checkmate(self, colour):
+        return (self.is_in_check(colour)
+                and len(self.get_legal_moves(colour)) == 0)
+
+    def is_bare_kings(self):
+        """
+        :return: 'True' if only the kings are left, which can't be won.
+        """
+        return all(type(piece) is King
+                   for colour in Colour for piece in self.get_pieces(colour))
+
+    def get_legal_moves(self, colour):
+        """
+        Generates every legal move for a colour in the current position,
+        or fetches them from the board's MoveCache if it has one.
+
+        :return: array('H') of packed moves, see encode_move.
+        """
+        if self.__move_cache is None:
+            return self.__generate_legal_moves(colour)
+
+        key = (self.hash, colour, self.__get_en_passant_move())
+        legal_moves = self.__move_cache.get(key)
+        if legal_moves is None:
+            legal_moves = self.__generate_legal_moves(colour)
+            self.__move_cache.put(key, legal_moves)
+        return legal_moves
+
+    def __get_en_passant_move(self):
+        """
+        The last move if it was a pawn's double step, which is the only
+        history that changes which moves are legal, else NO_MOVE.
+        """
+        last_move = self.get_last_move()
+        if last_move == NO_MOVE:
+            return NO_MOVE
+        (x0, y0), (x1, y1) = decode_move(last_move)
+        if type(self.__tiles[x1][y1]) is Pawn and abs(y1 - y0) == 2:
+            return last_move
+        return NO_MOVE
+
+    def __generate_legal_moves(self, colour):
+        prev_move = self.get_last_move()
+        legal_moves = array('H')
+        for piece in self.get_pieces(colour):
+            from_sq = _SQUARES[piece.pos]
+            is_pawn = type(piece) is Pawn
+            for new_pos in piece.get_legal_moves(self, prev_move=prev_move):
+                move = from_sq | (_SQUARES[new_pos] << 6)
+                if not is_pawn:
+                    legal_moves.append(move)
+                elif new_pos[1] in (0, 7):
+                    for i in range(0, len(_PROMOTION_PIECES)):
+                        legal_moves.append(move | PROMOTION_FLAG | (i << 12))
+                elif (new_pos[0] != piece.pos[0]
+                        and self.__tiles[new_pos[0]][new_pos[1]] is None):
+                    legal_moves.append(move | EN_PASSANT_FLAG)
+                else:
+                    legal_moves.append(move)
+        return legal_moves
+
+    def get_check_info(self, colour):
+        """
+        Gets the checkers, check-blocking mask and pins against a colour's
+        king, computing them at most once per position.
+        """
+        info = self.__check_info.get(colour)
+        if info is None:
+            info = self.__compute_check_info(colour)
+            self.__check_info[colour] = info
+        return info
+
+    def is_square_attacked(self, pos, by_colour, ignore=None):
+        """
+        Whether any piece of by_colour attacks pos, looking outwards from
+        pos rather than generating the attackers' moves.
+
+        :param ignore: Optional position treated as empty, e.g. the tile a
+            king is moving away from.
+        """
+        tiles = self.__tiles
+        for x, y in _KNIGHT_TARGETS[pos]:
+            piece = tiles[x][y]
+            if (type(piece) is Knight and piece.colour is by_colour):
+                return True
+        for x, y in _KING_TARGETS[pos]:
+            piece = tiles[x][y]
+            if (type(piece) is King and piece.colour is by_colour):
+                return True
+
+        pawn_y = pos[1] - (1 if by_colour is Colour.WHITE else -1)
+        if 0 <= pawn_y <= 7:
+            for pawn_x in (pos[0] - 1, pos[0] + 1):
+                if 0 <= pawn_x <= 7:
+                    piece = tiles[pawn_x][pawn_y]
+                    if type(piece) is Pawn and piece.colour is by_colour:
                         return True
+
+        for vector, ray in _RAYS[pos].items():
+            sliders = (Rook, Queen) if vector in _ORTHOGONAL_VECTORS \
+                else (Bishop, Queen)
+            for x, y in ray:
+                if (x, y) == ignore:
+                    continue
+                piece = tiles[x][y]
+                if piece is None:
+                    continue
+                if piece.colour is by_colour and type(piece) in sliders:
+                    return True
+                break
         return False
 
-    def is_checkmate(self, colour):
+    def get_attackers(self, pos, by_colour, ignore=()):
+        """
+        Gets every piece of by_colour attacking pos. Pins are not taken into
+        account.
+
+        :param ignore: Positions treated as empty, e.g. pieces already
+            traded off on pos, so sliders behind them are found.
+        :return: List of pieces.
+        """
+        tiles = self.__tiles
+        attackers = []
+        for x, y in _KNIGHT_TARGETS[pos]:
+            piece = tiles[x][y]
+            if (type(piece) is Knight and piece.colour is by_colour
+                    and (x, y) not in ignore):
+                attackers.append(piece)
+        for x, y in _KING_TARGETS[pos]:
+            piece = tiles[x][y]
+            if (type(piece) is King and piece.colour is by_colour
+                    and (x, y) not in ignore):
+                attackers.append(piece)
+
+        pawn_y = pos[1] - (1 if by_colour is Colour.WHITE else -1)
+        if 0 <= pawn_y <= 7:
+            for pawn_x in (pos[0] - 1, pos[0] + 1):
+                if 0 <= pawn_x <= 7 and (pawn_x, pawn_y) not in ignore:
+                    piece = tiles[pawn_x][pawn_y]
+                    if type(piece) is Pawn and piece.colour is by_colour:
+                        attackers.append(piece)
+
+        for vector, ray in _RAYS[pos].items():
+            sliders = (Rook, Queen) if vector in _ORTHOGONAL_VECTORS \
+                else (Bishop, Queen)
+            for x, y in ray:
+                piece = tiles[x][y]
+                if piece is None or (x, y) in ignore:
+                    continue
+                if piece.colour is by_colour and type(piece) in sliders:
+                    attackers.append(piece)
+                break
+        return attackers
+
+    def __compute_check_info(self, colour):
         king_pos = self.king_pos_dict[colour]
-        king = self.__tiles[king_pos[0]][king_pos[1]]
-        return self.is_in_check(colour) and len(king.get_moves()) == 0
+        if king_pos not in _RAYS:
+            return CheckInfo([], None, {})
+
+        tiles = self.__tiles
+        enemy = colour.opponent()
+        checkers = []
+        mask = set()
+        pins = {}
+
+        for vector, ray in _RAYS[king_pos].items():
+            sliders = (Rook, Queen) if vector in _ORTHOGONAL_VECTORS \
+                else (Bishop, Queen)
+            pinned_pos = None
+            for i, (x, y) in enumerate(ray):
+                piece = tiles[x][y]
+                if piece is None:
+                    continue
+                if piece.colour is colour:
+                    if pinned_pos is not None:
+                        break
+                    pinned_pos = (x, y)
+                    continue
+                if type(piece) in sliders:
+                    if pinned_pos is None:
+                        checkers.append((x, y))
+                        mask.update(ray[:i + 1])
+                    else:
+                        pins[pinned_pos] = set(ray[:i + 1])
+                break
+
+        for x, y in _KNIGHT_TARGETS[king_pos]:
+            piece = tiles[x][y]
+            if type(piece) is Knight and piece.colour is enemy:
+                checkers.append((x, y))
+                mask.add((x, y))
+
+        pawn_y = king_pos[1] + (1 if colour is Colour.WHITE else -1)
+        if 0 <= pawn_y <= 7:
+            for pawn_x in (king_pos[0] - 1, king_pos[0] + 1):
+                if 0 <= pawn_x <= 7:
+                    piece = tiles[pawn_x][pawn_y]
+                    if type(piece) is Pawn and piece.colour is enemy:
+                        checkers.append((pawn_x, pawn_y))
+                        mask.add((pawn_x, pawn_y))
+
+        if len(checkers) == 0:
+            check_mask = None
+        elif len(checkers) == 1:
+            check_mask = mask
+        else:
+            # Double check, only the king can move
+            check_mask = set()
+        return CheckInfo(checkers, check_mask, pins)
 
     def __update_king_dict(self, piece):
         if type(piece) is King:
@@ -134,31 +785,37 @@ class ChessPiece(ABC):
         """
         pass
 
+    def get_legal_moves(self, board, **kwargs):
+        """
+        As get_moves, but dropping moves that would leave the king in
+        check, using the board's precomputed checkers and pins.
+
+        :return: List of (x,y) coordinate tuples.
+        """
+        check_info = board.get_check_info(self.colour)
+        return [move for move in self.get_moves(board, **kwargs)
+                if check_info.allows(self.pos, move)]
+
     def _get_diagonal_moves(self, board):
-        diagonal_vectors = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
         board_tiles = board.get_tiles()
-        return self.__get_moves_from_vectors(board_tiles, diagonal_vectors)
+        return self.__get_moves_from_vectors(board_tiles, _DIAGONAL_VECTORS)
 
     def _get_orthogonal_moves(self, board):
-        orthogonal_vectors = [(1, 0), (-1, 0), (0, 1), (0, -1)]
         board_tiles = board.get_tiles()
-        return self.__get_moves_from_vectors(board_tiles, orthogonal_vectors)
-
-    def _get_cell_from_vector(self, cell, vector):
-        return cell[0] + vector[0], cell[1] + vector[1]
+        return self.__get_moves_from_vectors(
+            board_tiles, _ORTHOGONAL_VECTORS)
 
     def __get_moves_from_vectors(self, board_tiles, vectors):
         available_moves = []
+        rays = _RAYS[self.pos]
         for vector in vectors:
-            curr_cell = self._get_cell_from_vector(self.pos, vector)
-            while self._is_cell_on_board(curr_cell):
-                x = curr_cell[0]
-                y = curr_cell[1]
-                if board_tiles[x][y] is not None:  # Piece in this position
-                    if board_tiles[x][y].colour is self.colour:
+            for curr_cell in rays[vector]:
+                tile = board_tiles[curr_cell[0]][curr_cell[1]]
+                if tile is not None:  # Piece in this position
+                    if tile.colour is self.colour:
                         # Can't move into your own piece
                         break
-                    elif type(board_tiles[x][y]) is King:
+                    elif type(tile) is King:
                         # Pretend we can 'move through' an enemy king for
                         # determining if a piece is in check
                         pass
@@ -167,7 +824,6 @@ class ChessPiece(ABC):
                         available_moves.append(curr_cell)
                         break
                 available_moves.append(curr_cell)
-                curr_cell = self._get_cell_from_vector(curr_cell, vector)
         return available_moves
 
     def _is_cell_on_board(self, cell):
@@ -182,24 +838,24 @@ class King(ChessPiece):
     def get_moves(self, board, **kwargs):
         avail_moves = []
         tiles = board.get_tiles()
-        for x in [-1, 0, 1]:
-            for y in [-1, 0, 1]:
-                new_x = self.pos[0] + x
-                new_y = self.pos[1] + y
-
-                if (self._is_cell_on_board((new_x, new_y))
-                        and (x, y) != (0, 0)
-                        and (tiles[new_x][new_y] is None
-                             or tiles[new_x][new_y].colour != self.colour)
-                        and not self.__is_pos_in_check(board, new_x, new_y)):
-                    avail_moves.append((new_x, new_y))
+        for cell in _KING_TARGETS[self.pos]:
+            new_x, new_y = cell
+            if ((tiles[new_x][new_y] is None
+                    or tiles[new_x][new_y].colour != self.colour)
+                    and not self.__is_pos_in_check(board, new_x, new_y)):
+                avail_moves.append(cell)
 
         return avail_moves
 
+    def get_legal_moves(self, board, **kwargs):
+        # get_moves already excludes tiles the king would be attacked on
+        return self.get_moves(board, **kwargs)
+
     def __is_pos_in_check(self, board, x, y):
-        new_board = copy.deepcopy(board)
-        new_board.king_pos_dict[self.colour] = (x, y)
-        return new_board.is_in_check(self.colour)
+        # Ignore our own tile so sliders checking along the line the king
+        # is moving on still see through to the new tile
+        return board.is_square_attacked(
+            (x, y), self.colour.opponent(), ignore=self.pos)
 
     def get_letter_representation(self):
         return 'K'
@@ -235,17 +891,8 @@ class Bishop(ChessPiece):
 class Knight(ChessPiece):
     def get_moves(self, board, **kwargs):
         available_moves = []
-        knight_vectors = \
-            [(1, 2), (-1, 2), (1, -2), (-1, -2),
-                (2, 1), (2, -1), (-2, 1), (-2, -1)]
-
         board_tiles = board.get_tiles()
-        potential_moves = [
-            self._get_cell_from_vector(self.pos, v)
-            for v in knight_vectors]
-        for move in potential_moves:
-            if not self._is_cell_on_board(move):
-                continue
+        for move in _KNIGHT_TARGETS[self.pos]:
             board_tile = board_tiles[move[0]][move[1]]
             if board_tile is not None and board_tile.colour is self.colour:
                 # Can't move to this tile if occupied by one of your pieces
@@ -278,15 +925,47 @@ class Pawn(ChessPiece):
             board_tiles, curr_x, curr_y, kwargs['prev_move'])
         return avail_moves
 
+    def get_legal_moves(self, board, **kwargs):
+        check_info = board.get_check_info(self.colour)
+        legal_moves = []
+        for move in self.get_moves(board, **kwargs):
+            if self.__is_en_passant(board, move):
+                # The captured pawn leaves a tile other than the one moved
+                # to, which the check mask and pins don't account for
+                if self.__is_en_passant_legal(board, move):
+                    legal_moves.append(move)
+            elif check_info.allows(self.pos, move):
+                legal_moves.append(move)
+        return legal_moves
+
     def get_letter_representation(self):
         return 'P'
 
+    def __is_en_passant(self, board, move):
+        return (move[0] != self.pos[0]
+                and board.get_tiles()[move[0]][move[1]] is None)
+
+    def __is_en_passant_legal(self, board, move):
+        old_pos = self.pos
+        captured = board.remove_piece((move[0], old_pos[1]))
+        board.remove_piece(old_pos)
+        self.pos = move
+        board.add_piece(self)
+        in_check = board.is_in_check(self.colour)
+        board.remove_piece(move)
+        self.pos = old_pos
+        board.add_piece(self)
+        board.add_piece(captured)
+        return not in_check
+
     def __get_l_r_moves(self, board_tiles, curr_x, curr_y):
         avail_moves = []
         potential_moves = [(curr_x - 1, curr_y + self.__dir),
             (curr_x + 1, curr_y + self.__dir)]
 
         for move in potential_moves:
+            if not self._is_cell_on_board(move):
+                continue
             tile = board_tiles[move[0]][move[1]]
             if tile is not None and tile.colour is not self.colour:
                 avail_moves.append(move)
@@ -295,7 +974,8 @@ class Pawn(ChessPiece):
 
     def __get_forward_moves(self, board_tiles, curr_x, curr_y):
         avail_moves = []
-        if board_tiles[curr_x][curr_y + self.__dir] is not None:
+        if not self._is_cell_on_board((curr_x, curr_y + self.__dir)) \
+                or board_tiles[curr_x][curr_y + self.__dir] is not None:
             return avail_moves
 
         avail_moves.append((curr_x, curr_y + self.__dir))
@@ -306,11 +986,101 @@ class Pawn(ChessPiece):
 
     def __get_en_passant_moves(self, board_tiles, x, y, prev_move):
         avail_moves = []
+        if not self._is_cell_on_board((x, y + (2 * self.__dir))):
+            # Too far up the board for an enemy pawn to have double
+            # stepped alongside
+            return avail_moves
         l_r = [(x + 1), (x - 1)]
         for x in l_r:
+            if not self._is_cell_on_board((x, y)):
+                continue
             # Check pawn is adjacent to current pawn, and if it has
             # only just moved into that square from the start line
             if (type(board_tiles[x][y]) is Pawn
-                    and prev_move == ((x, y + (2 * self.__dir)), (x, y))):
+                    and prev_move == encode_move(
+                        (x, y + (2 * self.__dir)), (x, y))):
                 avail_moves.append((x, y + self.__dir))
         return avail_moves
+
+
+# Indexed by the promotion bits of a packed move
+_PROMOTION_PIECES = (Knight, Bishop, Rook, Queen)
+
+# Piece codes in an encoded board, 0 being an empty square. Black's codes
+# follow white's.
+_CODED_PIECES = (Pawn, Knight, Bishop, Rook, Queen, King)
+_PIECE_CODES = {
+    Colour.WHITE: dict((cls, i + 1) for i, cls in enumerate(_CODED_PIECES)),
+    Colour.BLACK: dict((cls, i + 7) for i, cls in enumerate(_CODED_PIECES))}
+
+
+def encode_board(board):
+    """
+    Packs the pieces on a board into 64 bytes, one piece code per square,
+    indexed like packed moves' squares. White's pawn to king are 1 to 6,
+    black's 7 to 12 and empty squares 0.
+    """
+    codes = bytearray(64)
+    for colour in Colour:
+        piece_codes = _PIECE_CODES[colour]
+        for piece in board.get_pieces(colour):
+            x, y = piece.pos
+            codes[y * 8 + x] = piece_codes[type(piece)]
+    return bytes(codes)
+
+
+def decode_board(codes, **kwargs):
+    """
+    Sets up a board from encode_board's output, or any 64 byte buffer
+    laid out the same way.
+
+    :param kwargs: Passed on to ChessBoard, e.g. move_cache.
+    """
+    board = ChessBoard(layout='blank', **kwargs)
+    for sq in range(0, 64):
+        code = codes[sq]
+        if code != 0:
+            colour = Colour.WHITE if code <= 6 else Colour.BLACK
+            piece_class = _CODED_PIECES[(code - 1) % 6]
+            board.add_piece(piece_class(_POSITIONS[sq], colour))
+    return board
+
+
+def _build_square_values():
+    """
+    Signed (middlegame, endgame) square values and phase weight for each
+    colour and piece class, black's values negated.
+    """
+    square_values = {}
+    for colour in Colour:
+        sign = 1 if colour is Colour.WHITE else -1
+        square_values[colour] = {}
+        for piece_class in (King, Queen, Rook, Bishop, Knight, Pawn):
+            letter = piece_class((0, 0), colour).get_letter_representation()
+            mg, eg = get_square_values(letter, colour is Colour.WHITE)
+            square_values[colour][piece_class] = (
+                tuple(sign * value for value in mg),
+                tuple(sign * value for value in eg),
+                PHASE_WEIGHTS[letter])
+    return square_values
+
+
+_SQUARE_VALUES = _build_square_values()
+
+
+def _build_zobrist_keys():
+    """
+    Random 64 bit key per colour, piece class and square. Seeded, so hashes
+    are the same in every process and run.
+    """
+    rng = Random(0x5EED)
+    keys = {}
+    for colour in Colour:
+        keys[colour] = {}
+        for piece_class in (King, Queen, Rook, Bishop, Knight, Pawn):
+            keys[colour][piece_class] = tuple(
+                rng.getrandbits(64) for _ in range(0, 64))
+    return keys
+
+
+_ZOBRIST_KEYS = _build_zobrist_keys()
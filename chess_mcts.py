@@ -0,0 +1,306 @@
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+import math
+import os
+import threading
+import time
+
+from chess_engine import PIECE_VALUES, evaluate
+from chess_logic import NO_MOVE, get_move_to
+
+
+class MctsEngine(object):
+    """
+    Monte Carlo tree search using UCT to pick which line to try next and
+    random playouts, biased towards captures, to score it.
+
+    Playouts are run in batches on a process pool. Each line picked for a
+    batch takes a virtual loss on its way down the tree, so the rest of the
+    batch spreads over other lines instead of all piling into the same one
+    before any result is back.
+
+    The tree is kept between calls to choose_move, so when the game follows
+    a line already searched the playouts made on it still count. As the
+    tree, random generator and pool are shared, calls from several threads
+    take turns; one instance should serve one game at a time.
+    """
+
+    def __init__(self, playouts=200, batch_size=16, workers=None,
+                 time_limit=None, exploration=1.4, max_playout_plies=40,
+                 seed=0):
+        """
+        :param playouts: Playouts per move, which sets the engine's
+            strength.
+        :param batch_size: Playouts sent to the workers at a time.
+        :param workers: Worker processes, one per CPU by default, 0 to run
+            playouts in this process.
+        :param time_limit: Optional seconds per move, after which no new
+            batch is started.
+        :param exploration: UCT exploration constant.
+        :param max_playout_plies: Plies after which a playout is scored by
+            static evaluation instead of played out.
+        :param seed: Seeds move choice in expansion and playouts.
+        """
+        self.playouts = playouts
+        self.batch_size = batch_size
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.max_playout_plies = max_playout_plies
+        self.seed = seed
+
+        self.__rng = Random(seed)
+        self.__pool = None
+        self.__root = None
+        self.__lock = threading.Lock()
+
+    def __reduce__(self):
+        # The pool and the tree stay behind, e.g. when sent to a tournament
+        # worker
+        return (MctsEngine, (self.playouts, self.batch_size, self.workers,
+                             self.time_limit, self.exploration,
+                             self.max_playout_plies, self.seed))
+
+    def close(self):
+        """
+        Shuts down the worker processes, if any were started.
+        """
+        with self.__lock:
+            if self.__pool is not None:
+                self.__pool.shutdown()
+                self.__pool = None
+
+    def choose_move(self, board, colour):
+        """
+        Searches the position for colour's best move. The board is left as
+        it was. At least one playout is made, so a legal move is found even
+        with no playouts or time to spare.
+
+        :return: The packed move, or NO_MOVE if colour has no legal moves.
+        """
+        with self.__lock:
+            root = self.__find_root(board, colour)
+            deadline = None
+            if self.time_limit is not None:
+                deadline = time.monotonic() + self.time_limit
+
+            done = 0
+            while True:
+                count = max(min(self.batch_size, self.playouts - done), 1)
+                self.__run_batch(board, root, count)
+                done += count
+                if done >= self.playouts or (
+                        deadline is not None
+                        and time.monotonic() >= deadline):
+                    break
+
+            if len(root.children) == 0:
+                return NO_MOVE
+            return max(root.children.values(),
+                       key=lambda child: child.visits).move
+
+    def get_root_visits(self):
+        """
+        :return: Playouts through the last searched position, including any
+            made by earlier searches and kept with the tree.
+        """
+        return self.__root.visits if self.__root is not None else 0
+
+    def __find_root(self, board, colour):
+        """
+        Gets the tree node for the board's position, reusing the last
+        search's tree when the moves since are in it.
+        """
+        root = self.__root
+        if root is not None and root.history == \
+                board.move_list[:len(root.history)]:
+            for move in board.move_list[len(root.history):]:
+                root = root.children.get(move)
+                if root is None:
+                    break
+        else:
+            root = None
+        # Nodes only expanded, never passed through, have no hash yet
+        if (root is None or root.hash not in (None, board.hash)
+                or root.colour is not colour):
+            root = _Node(NO_MOVE, None, colour)
+        # Let the rest of the old tree be freed
+        root.parent = None
+        root.move = NO_MOVE
+        root.history = board.move_list[:]
+        self.__root = root
+        return root
+
+    def __run_batch(self, board, root, count):
+        leaves = []
+        for _ in range(0, count):
+            leaf, path = self.__select(board, root)
+            leaves.append((leaf, path))
+
+        paths = [path for _, path in leaves]
+        results = self.__run_playouts(board, root.colour, paths)
+        for (leaf, _), result in zip(leaves, results):
+            node = leaf
+            while node is not None:
+                node.virtual_losses -= 1
+                node.visits += 1
+                # Each node scores the moves into it for the side that
+                # made them
+                node.value += result if node.colour is not root.colour \
+                    else 1 - result
+                node = node.parent
+
+    def __select(self, board, root):
+        """
+        Walks down the tree by UCT, adding a virtual loss to each node
+        passed, and expands one new child at the end. The board is left as
+        it was.
+
+        :return: Tuple (new leaf, moves from root to it).
+        """
+        node = root
+        path = []
+        colour = root.colour
+        try:
+            while True:
+                node.virtual_losses += 1
+                if node.untried is None:
+                    node.hash = board.hash
+                    node.untried = list(board.get_legal_moves(colour))
+                    self.__rng.shuffle(node.untried)
+                if len(node.untried) > 0:
+                    move = node.untried.pop()
+                    child = _Node(move, node, colour.opponent())
+                    node.children[move] = child
+                    child.virtual_losses += 1
+                    return child, path + [move]
+                if len(node.children) == 0:
+                    # Checkmate or stalemate, the playout scores it as is
+                    return node, path
+                node = self.__get_best_child(node)
+                board.make_move(node.move)
+                path.append(node.move)
+                colour = colour.opponent()
+        finally:
+            for _ in path:
+                board.unmake_move()
+
+    def __get_best_child(self, node):
+        visits = node.visits + node.virtual_losses
+        log_visits = math.log(max(visits, 1))
+
+        def uct(child):
+            n = child.visits + child.virtual_losses
+            # Virtual losses count as visits that scored nothing
+            return (child.value / n
+                    + self.exploration * math.sqrt(log_visits / n))
+
+        return max(node.children.values(), key=uct)
+
+    def __run_playouts(self, board, colour, paths):
+        seeds = [self.__rng.getrandbits(32) for _ in paths]
+        if self.workers == 0:
+            return _run_playouts(board, colour, paths, seeds,
+                                 self.max_playout_plies)
+
+        if self.__pool is None:
+            self.__pool = ProcessPoolExecutor(max_workers=self.workers)
+        chunks = min(self.workers, len(paths))
+        futures = [self.__pool.submit(_run_playouts, board, colour,
+                                      paths[i::chunks], seeds[i::chunks],
+                                      self.max_playout_plies)
+                   for i in range(0, chunks)]
+
+        # Undo the striping so results line up with paths again
+        results = [None] * len(paths)
+        for i, future in enumerate(futures):
+            results[i::chunks] = future.result()
+        return results
+
+
+class _Node(object):
+    """
+    One position in the search tree.
+    """
+
+    def __init__(self, move, parent, colour):
+        """
+        :param move: The move leading here from parent.
+        :param colour: The colour to move in this position.
+        """
+        self.move = move
+        self.parent = parent
+        self.colour = colour
+        self.children = {}
+        # Legal moves not yet expanded, filled on the first visit
+        self.untried = None
+        self.visits = 0
+        # Sum of playout scores for the side that moved into this node
+        self.value = 0.0
+        self.virtual_losses = 0
+        # Zobrist hash of the position, set on the first visit
+        self.hash = None
+        # Moves played to reach the position, set on the root only
+        self.history = None
+
+
+# Chance a playout move is the best capture available, when there is one
+_CAPTURE_BIAS = 0.5
+
+
+def _run_playouts(board, colour, paths, seeds, max_plies):
+    """
+    Plays one random game from the end of each path. Run in the workers.
+
+    :param paths: Lists of packed moves from board's position.
+    :return: List of scores for colour: 1 for a win, 0 for a loss, 0.5
+        for a draw, or in between for a game scored by evaluation.
+    """
+    results = []
+    for path, seed in zip(paths, seeds):
+        for move in path:
+            board.make_move(move)
+        mover = colour if len(path) % 2 == 0 else colour.opponent()
+        results.append(_play_out(board, colour, mover, Random(seed),
+                                 max_plies))
+        for _ in path:
+            board.unmake_move()
+    return results
+
+
+def _play_out(board, colour, mover, rng, max_plies):
+    plies = 0
+    try:
+        while True:
+            moves = board.get_legal_moves(mover)
+            if len(moves) == 0:
+                if not board.is_in_check(mover):
+                    return 0.5
+                return 0.0 if mover is colour else 1.0
+            if plies >= max_plies:
+                # Expected score for an evaluation, as in Elo
+                score = evaluate(board, colour)
+                return 1 / (1 + 10 ** (-score / 400))
+            if board.is_bare_kings():
+                return 0.5
+
+            board.make_move(_choose_playout_move(board, moves, rng))
+            plies += 1
+            mover = mover.opponent()
+    finally:
+        for _ in range(0, plies):
+            board.unmake_move()
+
+
+def _choose_playout_move(board, moves, rng):
+    if rng.random() < _CAPTURE_BIAS:
+        tiles = board.get_tiles()
+        best, best_value = NO_MOVE, 0
+        for move in moves:
+            x, y = get_move_to(move)
+            victim = tiles[x][y]
+            if victim is not None and PIECE_VALUES[type(victim)] > best_value:
+                best, best_value = move, PIECE_VALUES[type(victim)]
+        if best != NO_MOVE:
+            return best
+    return moves[rng.randrange(len(moves))]
@@ -0,0 +1,247 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import os
+import re
+
+from chess_logic import (
+    EN_PASSANT_FLAG, NO_MOVE, Bishop, King, Knight, Pawn, Queen, Rook,
+    get_move_from, get_move_promotion, get_move_to)
+
+_FILES = 'abcdefgh'
+
+_SAN_PIECES = {'N': Knight, 'B': Bishop, 'R': Rook, 'Q': Queen, 'K': King}
+
+# Piece letter, from file and rank for disambiguation, capture, target
+# square, promotion, then check marks and annotations, which are ignored
+_SAN_PATTERN = re.compile(
+    r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?[+#]?[!?]*$')
+
+_TAG_PATTERN = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+_RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+# Seven Tag Roster, in the order PGN requires
+_TAG_ORDER = ['Event', 'Site', 'Date', 'Round', 'White', 'Black', 'Result']
+
+
+def square_name(pos):
+    """
+    Converts (x, y) board coordinates to a square name, e.g. (4, 3) -> 'e4'.
+    """
+    return _FILES[pos[0]] + str(pos[1] + 1)
+
+
+def move_to_san(board, colour, move):
+    """
+    Gets the Standard Algebraic Notation for a legal move, e.g. 'Nxe5+'.
+    The board is left as it was.
+
+    :param move: Packed move for a piece of colour.
+    """
+    (x0, y0), (x1, y1) = get_move_from(move), get_move_to(move)
+    tiles = board.get_tiles()
+    piece = tiles[x0][y0]
+    is_capture = tiles[x1][y1] is not None or move & EN_PASSANT_FLAG
+
+    if type(piece) is Pawn:
+        san = _FILES[x0] + 'x' if is_capture else ''
+        san += square_name((x1, y1))
+        promotion = get_move_promotion(move)
+        if promotion is not None:
+            promoted = promotion((x1, y1), colour)
+            san += '=' + promoted.get_letter_representation()
+    else:
+        san = piece.get_letter_representation()
+        san += _get_disambiguation(board, colour, move)
+        san += 'x' if is_capture else ''
+        san += square_name((x1, y1))
+
+    board.make_move(move)
+    opponent = colour.opponent()
+    if board.is_in_check(opponent):
+        san += '#' if len(board.get_legal_moves(opponent)) == 0 else '+'
+    board.unmake_move()
+    return san
+
+
+def _get_disambiguation(board, colour, move):
+    tiles = board.get_tiles()
+    (x0, y0), new_pos = get_move_from(move), get_move_to(move)
+    piece_type = type(tiles[x0][y0])
+    rivals = [get_move_from(other)
+              for other in board.get_legal_moves(colour)
+              if get_move_to(other) == new_pos
+              and get_move_from(other) != (x0, y0)]
+    rivals = [old for old in rivals
+              if type(tiles[old[0]][old[1]]) is piece_type]
+    if len(rivals) == 0:
+        return ''
+    if all(old[0] != x0 for old in rivals):
+        return _FILES[x0]
+    if all(old[1] != y0 for old in rivals):
+        return str(y0 + 1)
+    return square_name((x0, y0))
+
+
+def parse_san(board, colour, san):
+    """
+    Looks up a move given in Standard Algebraic Notation.
+
+    :return: The packed legal move, or NO_MOVE if san is not a legal move
+        for colour. Castling is never legal, as the board doesn't support
+        it.
+    """
+    match = _SAN_PATTERN.match(san)
+    if match is None:
+        return NO_MOVE
+    letter, from_file, from_rank, target, promotion = match.groups()
+    piece_type = _SAN_PIECES[letter] if letter is not None else Pawn
+    new_pos = (_FILES.index(target[0]), int(target[1]) - 1)
+    promotion = _SAN_PIECES[promotion] if promotion is not None else None
+
+    tiles = board.get_tiles()
+    for move in board.get_legal_moves(colour):
+        if get_move_to(move) != new_pos:
+            continue
+        x, y = get_move_from(move)
+        if (type(tiles[x][y]) is piece_type
+                and (from_file is None or _FILES[x] == from_file)
+                and (from_rank is None or y + 1 == int(from_rank))
+                and get_move_promotion(move) is promotion):
+            return move
+    return NO_MOVE
+
+
+def read_games(stream):
+    """
+    Reads games from PGN text one at a time, so collections of any size
+    can be streamed. Comments, variations and numeric annotations are
+    skipped.
+
+    :param stream: Text stream, e.g. an open file.
+    :return: Generator of tuples (tags, SAN moves, result).
+    """
+    tags = {}
+    tokens = []
+    for line in stream:
+        line = line.strip()
+        if line.startswith('%'):
+            # Escaped line, for tools' private data
+            continue
+        match = _TAG_PATTERN.match(line)
+        if match is not None:
+            if len(tokens) > 0:
+                # A game without a result token
+                yield _finish_game(tags, tokens)
+                tags, tokens = {}, []
+            tags[match.group(1)] = match.group(2)
+            continue
+
+        # Rest-of-line comment
+        tokens.extend(line.split(';', 1)[0].split())
+        if len(tokens) > 0 and tokens[-1] in _RESULTS:
+            yield _finish_game(tags, tokens)
+            tags, tokens = {}, []
+    if len(tags) > 0 or len(tokens) > 0:
+        yield _finish_game(tags, tokens)
+
+
+def _finish_game(tags, tokens):
+    text = ' '.join(tokens)
+    # Comments don't nest, but variations may
+    text = re.sub(r'\{[^}]*\}', ' ', text)
+    while '(' in text:
+        text, count = re.subn(r'\([^()]*\)', ' ', text)
+        if count == 0:
+            break
+
+    san_moves = []
+    result = tags.get('Result', '*')
+    for token in text.split():
+        # Drop move numbers, e.g. '12.' or '12...', also when joined to
+        # the move as in '12.e4'
+        token = re.sub(r'^\d+\.+', '', token)
+        if token == '' or token.startswith('$'):
+            continue
+        if token in _RESULTS:
+            result = token
+        else:
+            san_moves.append(token)
+    return tags, san_moves, result
+
+
+def get_batches(games, batch_size):
+    """
+    Splits games, e.g. from read_games, into lists of up to batch_size.
+
+    :return: Generator of lists.
+    """
+    batch = []
+    for game in games:
+        batch.append(game)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if len(batch) > 0:
+        yield batch
+
+
+def map_batches(function, games, batch_size=200, workers=None, args=()):
+    """
+    Calls function(batch, *args) on batches of games in worker processes.
+    A few batches queue per worker so none sits idle waiting on the
+    caller, while memory stays bounded on any size of input.
+
+    :param function: Module-level function, so it can be sent to workers.
+    :param workers: Worker processes, one per CPU by default, 0 to call
+        function in this process.
+    :return: Generator of function's results, in the order of the batches.
+    """
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if workers == 0:
+        for batch in get_batches(games, batch_size):
+            yield function(batch, *args)
+        return
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in get_batches(games, batch_size):
+            pending.append(pool.submit(function, batch, *args))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while len(pending) > 0:
+            yield pending.popleft().result()
+
+
+def format_game(tags, san_moves, result):
+    """
+    Formats a finished game as PGN text.
+
+    :param tags: Dict of tag name to value. Missing Seven Tag Roster tags
+        are filled with '?'.
+    :param san_moves: The moves played, in SAN, starting with white.
+    :param result: '1-0', '0-1', '1/2-1/2' or '*'.
+    :return: The game as a string, ending with a blank line.
+    """
+    tags = dict(tags)
+    tags['Result'] = result
+    names = _TAG_ORDER + [name for name in tags if name not in _TAG_ORDER]
+    lines = ['[{} "{}"]'.format(name, tags.get(name, '?')) for name in names]
+    lines.append('')
+
+    tokens = []
+    for i, san in enumerate(san_moves):
+        if i % 2 == 0:
+            tokens.append('{}.'.format(i // 2 + 1))
+        tokens.append(san)
+    tokens.append(result)
+
+    # PGN export format keeps lines under 80 characters
+    line = ''
+    for token in tokens:
+        if len(line) + len(token) + 1 > 79:
+            lines.append(line)
+            line = token
+        else:
+            line = token if line == '' else line + ' ' + token
+    lines.append(line)
+    return '\n'.join(lines) + '\n\n'
@@ -0,0 +1,165 @@
+from multiprocessing import shared_memory
+import threading
+
+from chess_logic import NO_MOVE, Colour, decode_board, encode_board
+
+# Each slot holds one position at a fixed layout: 64 piece codes (see
+# encode_board), then the side to move (0 white, 1 black), then the last
+# move played as a little-endian packed move, for en passant.
+SLOT_SIZE = 67
+_TURN_OFFSET = 64
+_LAST_MOVE_OFFSET = 65
+
+
+class SharedBoards(object):
+    """
+    Positions stored in a block of shared memory, one per numbered slot.
+    Any process attached to the block reads and writes positions by slot
+    index, so boards pass between processes without being pickled.
+
+    Slots aren't locked: a slot should only be written while no other
+    process is reading it, e.g. by handing slot indexes out with the jobs
+    that use them.
+    """
+
+    def __init__(self, name, slot_count):
+        """
+        Attaches to an existing block made by a BoardPool in a parent
+        process, e.g. from a ProcessPoolExecutor worker. Children share
+        the parent's resource tracker, so the block isn't removed when a
+        worker exits.
+
+        :param name: The block's name, see BoardPool.name.
+        """
+        self._memory = shared_memory.SharedMemory(name=name)
+        self.slot_count = slot_count
+
+    @property
+    def name(self):
+        return self._memory.name
+
+    def write(self, index, board, colour):
+        """
+        Stores a position in a slot.
+
+        :param colour: The colour to move.
+        """
+        buffer = self._memory.buf
+        offset = self.__get_offset(index)
+        buffer[offset:offset + 64] = encode_board(board)
+        buffer[offset + _TURN_OFFSET] = 0 if colour is Colour.WHITE else 1
+        last_move = board.get_last_move()
+        buffer[offset + _LAST_MOVE_OFFSET] = last_move & 0xFF
+        buffer[offset + _LAST_MOVE_OFFSET + 1] = last_move >> 8
+
+    def read(self, index, **kwargs):
+        """
+        Sets up a new board from a slot.
+
+        :param kwargs: Passed on to ChessBoard, e.g. move_cache.
+        :return: Tuple (board, colour to move).
+        """
+        buffer = self._memory.buf
+        offset = self.__get_offset(index)
+        board = decode_board(bytes(buffer[offset:offset + 64]), **kwargs)
+        colour = Colour.WHITE if buffer[offset + _TURN_OFFSET] == 0 \
+            else Colour.BLACK
+        last_move = (buffer[offset + _LAST_MOVE_OFFSET]
+                     | buffer[offset + _LAST_MOVE_OFFSET + 1] << 8)
+        if last_move != NO_MOVE:
+            # Enough history for the board to see an en passant chance
+            board.move_list.append(last_move)
+        return board, colour
+
+    def get_codes(self, index):
+        """
+        Gets a slot's 64 piece codes in place, for jobs that can work on
+        the encoding directly without setting up a board.
+
+        :return: memoryview, valid until close is called.
+        """
+        offset = self.__get_offset(index)
+        return self._memory.buf[offset:offset + 64]
+
+    def __get_offset(self, index):
+        # The block may be larger than asked for, rounded up to whole
+        # pages, so a bad index wouldn't always fail on its own
+        if not 0 <= index < self.slot_count:
+            raise IndexError('slot index out of range: {}'.format(index))
+        return index * SLOT_SIZE
+
+    def close(self):
+        """
+        Detaches from the block. Views from get_codes must be released
+        first.
+        """
+        self._memory.close()
+
+
+class BoardPool(SharedBoards):
+    """
+    Creates and owns a block of board slots, handing out free slots and
+    taking them back for reuse.
+
+    Allocation happens in the owning process only, which passes slot
+    indexes to workers along with name and slot_count so they can attach
+    with SharedBoards.
+    """
+
+    def __init__(self, slot_count=1024):
+        self._memory = shared_memory.SharedMemory(
+            create=True, size=slot_count * SLOT_SIZE)
+        self.slot_count = slot_count
+        # Most recently freed slots are handed out first, as they are the
+        # likeliest to still be in cache
+        self.__free = list(range(slot_count - 1, -1, -1))
+        self.__allocated = set()
+        self.__lock = threading.Lock()
+
+    def allocate(self):
+        """
+        :return: The index of a free slot, or 'None' if every slot is in
+            use.
+        """
+        with self.__lock:
+            if len(self.__free) == 0:
+                return None
+            index = self.__free.pop()
+            self.__allocated.add(index)
+            return index
+
+    def free(self, index):
+        """
+        Returns a slot for reuse.
+
+        :return: 'False' if the slot wasn't allocated, e.g. it is out of
+            range or already free, else 'True'.
+        """
+        with self.__lock:
+            if index not in self.__allocated:
+                return False
+            self.__allocated.remove(index)
+            self.__free.append(index)
+            return True
+
+    def get_free_count(self):
+        return len(self.__free)
+
+    def put(self, board, colour):
+        """
+        Stores a position in a newly allocated slot.
+
+        :return: The slot index, or 'None' if every slot is in use.
+        """
+        index = self.allocate()
+        if index is not None:
+            self.write(index, board, colour)
+        return index
+
+    def close(self):
+        """
+        Detaches from and removes the block. Attached processes keep their
+        mapping until they close it.
+        """
+        self._memory.close()
+        self._memory.unlink()
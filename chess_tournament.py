@@ -0,0 +1,279 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from random import Random
+import argparse
+import math
+import os
+
+from chess_engine import ChessEngine
+from chess_logic import ChessBoard, Colour
+from chess_pgn import format_game, move_to_san
+
+WHITE_WIN = '1-0'
+BLACK_WIN = '0-1'
+DRAW = '1/2-1/2'
+
+
+def play_game(white, black, opening_plies=4, max_plies=200, seed=0):
+    """
+    Plays one engine-vs-engine game from the standard position.
+
+    :param white: Engine with a choose_move(board, colour) method.
+    :param opening_plies: Number of random legal moves played first, so
+        games between deterministic engines differ.
+    :param max_plies: Game is adjudicated a draw after this many plies.
+    :param seed: Seeds the random opening.
+    :return: Tuple (result, list of SAN moves).
+    """
+    board = ChessBoard()
+    rng = Random(seed)
+    engines = {Colour.WHITE: white, Colour.BLACK: black}
+    colour = Colour.WHITE
+    san_moves = []
+
+    while len(san_moves) < max_plies:
+        legal_moves = board.get_legal_moves(colour)
+        if len(legal_moves) == 0:
+            if not board.is_in_check(colour):
+                return DRAW, san_moves
+            return (BLACK_WIN if colour is Colour.WHITE else WHITE_WIN,
+                    san_moves)
+        if board.is_bare_kings():
+            return DRAW, san_moves
+
+        if len(san_moves) < opening_plies:
+            move = rng.choice(legal_moves)
+        else:
+            move = engines[colour].choose_move(board, colour)
+        san_moves.append(move_to_san(board, colour, move))
+        board.make_move(move)
+        colour = colour.opponent()
+    return DRAW, san_moves
+
+
+def _get_expected_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def _get_elo(score):
+    if score <= 0:
+        return -math.inf
+    if score >= 1:
+        return math.inf
+    return -400 * math.log10(1 / score - 1)
+
+
+class TournamentResult(object):
+    """
+    Running win/draw/loss totals, from engine A's point of view.
+    """
+
+    def __init__(self):
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+
+    def add(self, score):
+        """
+        :param score: 1, 0.5 or 0 for an A win, draw or loss.
+        """
+        if score == 1:
+            self.wins += 1
+        elif score == 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    def get_game_count(self):
+        return self.wins + self.draws + self.losses
+
+    def get_score(self):
+        return (self.wins + self.draws / 2) / self.get_game_count()
+
+    def get_score_variance(self):
+        """
+        Variance of a single game's score.
+        """
+        n = self.get_game_count()
+        score = self.get_score()
+        return (self.wins * (1 - score) ** 2
+                + self.draws * (0.5 - score) ** 2
+                + self.losses * score ** 2) / n
+
+    def get_elo(self):
+        return _get_elo(self.get_score())
+
+    def get_elo_interval(self, z=1.96):
+        """
+        Confidence interval for the Elo difference, 95% by default.
+
+        :return: Tuple (low, high).
+        """
+        score = self.get_score()
+        margin = z * math.sqrt(self.get_score_variance()
+                               / self.get_game_count())
+        return _get_elo(score - margin), _get_elo(score + margin)
+
+    def __str__(self):
+        low, high = self.get_elo_interval()
+        return '+{} ={} -{}  Elo {:+.1f} [{:+.1f}, {:+.1f}]'.format(
+            self.wins, self.draws, self.losses, self.get_elo(), low, high)
+
+
+class Sprt(object):
+    """
+    Sequential probability ratio test of H0: elo = elo0 against
+    H1: elo = elo1, using the normal approximation to the game scores.
+    """
+    H0 = 'H0'
+    H1 = 'H1'
+
+    def __init__(self, elo0=0, elo1=5, alpha=0.05, beta=0.05):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower_bound = math.log(beta / (1 - alpha))
+        self.upper_bound = math.log((1 - beta) / alpha)
+
+    def get_llr(self, result):
+        """
+        Log-likelihood ratio of H1 to H0 given the games so far.
+        """
+        n = result.get_game_count()
+        score = result.get_score()
+        # One pseudo-draw keeps the variance positive when every game so
+        # far has had the same result
+        variance = ((n * result.get_score_variance() + (0.5 - score) ** 2)
+                    / (n + 1))
+        if variance == 0:
+            return 0.0
+        s0 = _get_expected_score(self.elo0)
+        s1 = _get_expected_score(self.elo1)
+        return n * (s1 - s0) * (2 * score - s0 - s1) / (2 * variance)
+
+    def get_decision(self, result):
+        """
+        :return: Sprt.H0 or Sprt.H1 once accepted, else 'None'.
+        """
+        llr = self.get_llr(result)
+        if llr >= self.upper_bound:
+            return Sprt.H1
+        if llr <= self.lower_bound:
+            return Sprt.H0
+        return None
+
+
+class Tournament(object):
+    """
+    Plays engine A against engine B across a process pool.
+
+    Games come in pairs sharing a random opening, with colours swapped, so
+    opening luck cancels out. At most 'concurrency' games are in flight, so
+    every worker stays busy while a decided SPRT can still stop the match
+    without waiting on a long queue.
+    """
+
+    def __init__(self, engine_a, engine_b, games=100, concurrency=None,
+                 sprt=None, pgn_stream=None, names=('A', 'B'),
+                 opening_plies=4, max_plies=200, seed=0):
+        """
+        :param engine_a: Picklable engine, e.g. ChessEngine(depth=2).
+        :param concurrency: Worker processes, one per CPU by default.
+        :param sprt: Optional Sprt to stop the match once it decides.
+        :param pgn_stream: Optional text stream each game is written to as
+            it finishes.
+        :param seed: Seeds the random openings, see play_game.
+        """
+        self.__engines = (engine_a, engine_b)
+        self.__games = games
+        self.__concurrency = concurrency or os.cpu_count() or 1
+        self.__sprt = sprt
+        self.__pgn_stream = pgn_stream
+        self.__names = names
+        self.__opening_plies = opening_plies
+        self.__max_plies = max_plies
+        self.__seed = seed
+        self.decision = None
+
+    def run(self):
+        """
+        Plays the match.
+
+        :return: TournamentResult for engine A.
+        """
+        result = TournamentResult()
+        next_game = 0
+        pending = {}
+        with ProcessPoolExecutor(max_workers=self.__concurrency) as pool:
+            while next_game < self.__games or len(pending) > 0:
+                while (next_game < self.__games
+                       and len(pending) < self.__concurrency
+                       and self.decision is None):
+                    pending[self.__submit(pool, next_game)] = next_game
+                    next_game += 1
+                if len(pending) == 0:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    game = pending.pop(future)
+                    self.__record(game, future.result(), result)
+
+                if self.__sprt is not None and self.decision is None:
+                    self.decision = self.__sprt.get_decision(result)
+        return result
+
+    def __submit(self, pool, game):
+        a_is_white = game % 2 == 0
+        white, black = self.__engines if a_is_white \
+            else reversed(self.__engines)
+        return pool.submit(play_game, white, black, self.__opening_plies,
+                           self.__max_plies, self.__seed + game // 2)
+
+    def __record(self, game, outcome, result):
+        game_result, san_moves = outcome
+        a_is_white = game % 2 == 0
+        if game_result == DRAW:
+            result.add(0.5)
+        else:
+            result.add(1 if (game_result == WHITE_WIN) == a_is_white else 0)
+
+        if self.__pgn_stream is not None:
+            white, black = self.__names if a_is_white \
+                else reversed(self.__names)
+            tags = {'Event': 'Self-play', 'Round': str(game + 1),
+                    'White': white, 'Black': black}
+            self.__pgn_stream.write(format_game(tags, san_moves, game_result))
+            self.__pgn_stream.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Play ChessEngine against itself at different depths.')
+    parser.add_argument('--depth-a', type=int, default=2)
+    parser.add_argument('--depth-b', type=int, default=1)
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=None)
+    parser.add_argument('--pgn', default=None,
+                        help='File to stream finished games to.')
+    parser.add_argument('--sprt', nargs=2, type=float, default=None,
+                        metavar=('ELO0', 'ELO1'))
+    args = parser.parse_args()
+
+    sprt = Sprt(args.sprt[0], args.sprt[1]) if args.sprt else None
+    pgn_stream = open(args.pgn, 'w') if args.pgn else None
+    try:
+        tournament = Tournament(
+            ChessEngine(depth=args.depth_a), ChessEngine(depth=args.depth_b),
+            games=args.games, concurrency=args.concurrency, sprt=sprt,
+            pgn_stream=pgn_stream)
+        result = tournament.run()
+    finally:
+        if pgn_stream is not None:
+            pgn_stream.close()
+
+    print(result)
+    if tournament.decision is not None:
+        print('SPRT accepted {}'.format(tournament.decision))
+
+
+if __name__ == '__main__':
+    main()
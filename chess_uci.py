@@ -0,0 +1,311 @@
+import sys
+import threading
+import time
+
+from chess_engine import MATE_SCORE, ChessEngine, SearchLimits
+from chess_logic import (
+    NO_MOVE, Bishop, ChessBoard, Colour, King, Knight, Pawn, Queen, Rook,
+    encode_move, get_move_from, get_move_promotion, get_move_to)
+from chess_pgn import square_name
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+_FEN_PIECES = {
+    'k': King, 'q': Queen, 'r': Rook, 'b': Bishop, 'n': Knight, 'p': Pawn}
+
+_PROMOTION_LETTERS = {'q': Queen, 'r': Rook, 'b': Bishop, 'n': Knight}
+
+# How often a finished ponder or infinite search checks whether it may
+# report its move yet, in seconds
+_WAIT_INTERVAL = 0.002
+
+
+def board_from_fen(fen, **kwargs):
+    """
+    Sets up a board from Forsyth-Edwards Notation. Castling rights and move
+    counters are ignored as the board has no use for them.
+
+    :param kwargs: Passed on to ChessBoard, e.g. move_cache.
+    :return: Tuple (board, colour to move).
+    """
+    fields = fen.split()
+    board = ChessBoard(layout='blank', **kwargs)
+    for i, rank in enumerate(fields[0].split('/')):
+        x, y = 0, 7 - i
+        for char in rank:
+            if char.isdigit():
+                x += int(char)
+                continue
+            colour = Colour.WHITE if char.isupper() else Colour.BLACK
+            board.add_piece(_FEN_PIECES[char.lower()]((x, y), colour))
+            x += 1
+
+    colour = Colour.WHITE if fields[1] == 'w' else Colour.BLACK
+    if len(fields) > 3 and fields[3] != '-':
+        # Replay the double step that allows en passant
+        x = ord(fields[3][0]) - ord('a')
+        if colour is Colour.WHITE:
+            board.move_list.append(encode_move((x, 6), (x, 4)))
+        else:
+            board.move_list.append(encode_move((x, 1), (x, 3)))
+    return board, colour
+
+
+def parse_uci_move(board, text):
+    """
+    Looks up a move in UCI long algebraic form, e.g. 'e7e8q'.
+
+    :return: The packed legal move, or NO_MOVE.
+    """
+    old_pos = (ord(text[0]) - ord('a'), int(text[1]) - 1)
+    new_pos = (ord(text[2]) - ord('a'), int(text[3]) - 1)
+    promotion = _PROMOTION_LETTERS.get(text[4:5], None)
+    return board.find_move(old_pos, new_pos, promotion)
+
+
+def format_uci_move(move):
+    if move == NO_MOVE:
+        return '0000'
+    text = square_name(get_move_from(move)) + square_name(get_move_to(move))
+    promotion = get_move_promotion(move)
+    for letter, piece_class in _PROMOTION_LETTERS.items():
+        if piece_class is promotion:
+            text += letter
+    return text
+
+
+class TimeManager(object):
+    """
+    Decides how long to think about one move given the clock.
+    """
+
+    def __init__(self, move_overhead=30, default_moves_to_go=30):
+        """
+        :param move_overhead: Milliseconds held back per move for
+            communication delays.
+        :param default_moves_to_go: Moves the remaining time is assumed to
+            cover when the GUI doesn't say.
+        """
+        self.move_overhead = move_overhead
+        self.default_moves_to_go = default_moves_to_go
+
+    def allocate(self, time_left, increment=0, moves_to_go=None):
+        """
+        All times in milliseconds.
+
+        :return: Tuple (soft, hard). No new search iteration should start
+            after soft, and the search must stop at hard.
+        """
+        moves_to_go = moves_to_go or self.default_moves_to_go
+        available = max(time_left - self.move_overhead, 1)
+        soft = min(available / moves_to_go + increment * 0.75,
+                   available * 0.5)
+        hard = min(soft * 4, available * 0.75)
+        return soft, hard
+
+
+class UciEngine(object):
+    """
+    Speaks the UCI protocol on a pair of text streams. Searches run on a
+    background thread so that 'stop', 'ponderhit' and 'isready' are
+    answered while the engine is thinking.
+    """
+
+    def __init__(self, engine=None, input_stream=None, output_stream=None,
+                 time_manager=None):
+        self.__engine = engine if engine is not None else ChessEngine()
+        self.__input = input_stream if input_stream is not None \
+            else sys.stdin
+        self.__output = output_stream if output_stream is not None \
+            else sys.stdout
+        self.__time_manager = time_manager if time_manager is not None \
+            else TimeManager()
+        self.__output_lock = threading.Lock()
+
+        self.__board, self.__colour = board_from_fen(START_FEN)
+        # Cleared when a 'position' move can't be played, e.g. castling,
+        # which the board doesn't support
+        self.__position_valid = True
+        self.__limits = None
+        self.__worker = None
+        # Search time to start counting down from on 'ponderhit'
+        self.__ponder_budget = None
+
+    def run(self):
+        """
+        Handles commands until 'quit' or the end of the input.
+        """
+        for line in self.__input:
+            if not self.handle_command(line):
+                break
+        self.__stop_search()
+
+    def handle_command(self, line):
+        """
+        :return: 'False' once the engine should quit, else 'True'.
+        """
+        tokens = line.split()
+        if len(tokens) == 0:
+            return True
+        command, args = tokens[0], tokens[1:]
+
+        if command == 'uci':
+            self.__send('id name py-chess')
+            self.__send('id author py-chess contributors')
+            self.__send('uciok')
+        elif command == 'isready':
+            self.__send('readyok')
+        elif command == 'ucinewgame':
+            self.__stop_search()
+            self.__engine.pawn_table.clear()
+            self.__board, self.__colour = board_from_fen(START_FEN)
+            self.__position_valid = True
+        elif command == 'position':
+            self.__stop_search()
+            self.__set_position(args)
+        elif command == 'go':
+            self.__stop_search()
+            self.__start_search(args)
+        elif command == 'stop':
+            self.__stop_search()
+        elif command == 'ponderhit':
+            self.__ponderhit()
+        elif command == 'quit':
+            return False
+        # Unknown commands are ignored, as UCI requires
+        return True
+
+    def __send(self, text):
+        with self.__output_lock:
+            self.__output.write(text + '\n')
+            self.__output.flush()
+
+    def __set_position(self, args):
+        if len(args) > 0 and args[0] == 'fen':
+            end = args.index('moves') if 'moves' in args else len(args)
+            fen = ' '.join(args[1:end])
+        else:
+            end = 1
+            fen = START_FEN
+        self.__board, self.__colour = board_from_fen(fen)
+        self.__position_valid = True
+
+        for text in args[end + 1:]:
+            move = parse_uci_move(self.__board, text)
+            if move == NO_MOVE:
+                self.__send('info string illegal move {}'.format(text))
+                self.__position_valid = False
+                return
+            self.__board.make_move(move)
+            self.__colour = self.__colour.opponent()
+
+    def __start_search(self, args):
+        if not self.__position_valid:
+            # Searching the partly replayed position would report a move
+            # that is illegal in the GUI's game
+            self.__send('bestmove 0000')
+            return
+        params = self.__parse_go_args(args)
+        limits = SearchLimits(depth=params.get('depth', None),
+                              pondering='ponder' in params)
+
+        budget = None
+        if 'movetime' in params:
+            budget = (params['movetime'], params['movetime'])
+        else:
+            side = 'w' if self.__colour is Colour.WHITE else 'b'
+            if side + 'time' in params:
+                budget = self.__time_manager.allocate(
+                    params[side + 'time'], params.get(side + 'inc', 0),
+                    params.get('movestogo', None))
+
+        self.__ponder_budget = None
+        if budget is not None:
+            if limits.pondering:
+                self.__ponder_budget = budget
+            else:
+                self.__set_deadlines(limits, budget)
+
+        self.__limits = limits
+        self.__worker = threading.Thread(
+            target=self.__search,
+            args=(limits, 'infinite' in params, time.monotonic()),
+            daemon=True)
+        self.__worker.start()
+
+    def __parse_go_args(self, args):
+        params = {}
+        i = 0
+        while i < len(args):
+            if args[i] in ('infinite', 'ponder'):
+                params[args[i]] = True
+                i += 1
+            elif i + 1 < len(args):
+                try:
+                    params[args[i]] = int(args[i + 1])
+                except ValueError:
+                    pass
+                i += 2
+            else:
+                i += 1
+        return params
+
+    def __set_deadlines(self, limits, budget):
+        now = time.monotonic()
+        limits.soft_deadline = now + budget[0] / 1000
+        limits.hard_deadline = now + budget[1] / 1000
+
+    def __ponderhit(self):
+        limits = self.__limits
+        if limits is None or not limits.pondering:
+            return
+        if self.__ponder_budget is not None:
+            self.__set_deadlines(limits, self.__ponder_budget)
+        limits.pondering = False
+
+    def __stop_search(self):
+        if self.__worker is None:
+            return
+        self.__limits.stop_event.set()
+        self.__worker.join()
+        self.__worker = None
+        self.__limits = None
+
+    def __search(self, limits, infinite, start_time):
+        def send_info(depth, score, nodes, pv):
+            elapsed = max(time.monotonic() - start_time, 0.001)
+            self.__send('info depth {} score {} nodes {} nps {} time {} '
+                        'pv {}'.format(depth, self.__format_score(score),
+                                       nodes, int(nodes / elapsed),
+                                       int(elapsed * 1000),
+                                       ' '.join(format_uci_move(move)
+                                                for move in pv)))
+
+        best_move, reply = self.__engine.search(
+            self.__board, self.__colour, limits, on_info=send_info)
+
+        # UCI forbids reporting a move while pondering or in an infinite
+        # search, so hold it until 'ponderhit' or 'stop'
+        while ((infinite or limits.pondering)
+               and not limits.stop_event.is_set()):
+            limits.stop_event.wait(_WAIT_INTERVAL)
+
+        text = 'bestmove ' + format_uci_move(best_move)
+        if reply != NO_MOVE:
+            text += ' ponder ' + format_uci_move(reply)
+        self.__send(text)
+
+    def __format_score(self, score):
+        if abs(score) >= MATE_SCORE - 1000:
+            plies = MATE_SCORE - abs(score)
+            moves = (plies + 1) // 2
+            return 'mate {}'.format(moves if score > 0 else -moves)
+        return 'cp {}'.format(score)
+
+
+def main():
+    UciEngine().run()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,14 @@
+import sys
+
 from chess_console import ChessConsoleManager
+from chess_uci import UciEngine
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'uci':
+        # Run as an engine for a UCI GUI rather than the console game
+        UciEngine().run()
+        return
     game = ChessConsoleManager()
     game.run()
 
@@ -1,3 +1,4 @@
+import asyncio
 import sys
 import unittest
 import io
@@ -31,7 +32,7 @@ class ChessConsoleIOTests(unittest.TestCase):
         with patch('builtins.input', return_value='1'):
             options = [(1, "Hello"), (2, "Goodbye")]
             expected_val = 1
-            actual_val = self.io.get_menu_input(options)
+            actual_val = asyncio.run(self.io.get_menu_input(options))
             self.assertEqual(expected_val, actual_val)
 
             expected_out = '1) Hello\n2) Goodbye\n\n'
@@ -42,7 +43,7 @@ class ChessConsoleIOTests(unittest.TestCase):
             options = [(1, "Hello"), (2, "Goodbye")]
 
             expected_val = 2
-            actual_val = self.io.get_menu_input(options)
+            actual_val = asyncio.run(self.io.get_menu_input(options))
             self.assertEqual(expected_val, actual_val)
 
             expected_out = '1) Hello\n2) Goodbye\n\nPlease select a ' \
@@ -51,16 +52,64 @@ class ChessConsoleIOTests(unittest.TestCase):
 
     def test_get_move_input_Happy(self):
         with patch('builtins.input', return_value='b1 h7'):
-            parsed_input = self.io.get_move_input()
+            parsed_input = asyncio.run(self.io.get_move_input())
             self.assertEqual(((1, 0), (7, 6)), parsed_input)
 
     def test_get_move_input_InvalidInputFirst(self):
         with patch('builtins.input', side_effect=['e2 99', 'e2 e4']) \
                 as mock_input:
-            parsed_input = self.io.get_move_input()
+            parsed_input = asyncio.run(self.io.get_move_input())
             self.assertEqual(((4, 1), (4, 3)), parsed_input)
             self.assertEqual(2, mock_input.call_count)
 
+    def test_render_board_FullFrameFirst(self):
+        board = ChessBoard()
+        asyncio.run(self.io.render_board(board))
+
+        expected_out = '\x1b[H\x1b[J' \
+            '8 |r|n|b|q|k|b|n|r|\n' \
+            '7 |p|p|p|p|p|p|p|p|\n' \
+            '6 | | | | | | | | |\n' \
+            '5 | | | | | | | | |\n' \
+            '4 | | | | | | | | |\n' \
+            '3 | | | | | | | | |\n' \
+            '2 |P|P|P|P|P|P|P|P|\n' \
+            '1 |R|N|B|Q|K|B|N|R|\n' \
+            '   a b c d e f g h\n\n'
+        self._assertOutput(expected_out)
+
+    def test_render_board_OnlyChangedTilesRedrawn(self):
+        board = ChessBoard()
+        asyncio.run(self.io.render_board(board))
+        full_frame_len = len(self.captured_output.getvalue())
+
+        board.move_piece((4, 1), (4, 3))
+        asyncio.run(self.io.render_board(board))
+
+        actual = self.captured_output.getvalue()[full_frame_len:]
+        self.assertEqual('\x1b[5;12HP\x1b[7;12H \x1b[11;1H\x1b[J', actual)
+
+    def test_render_board_NewBoardRedrawnInFull(self):
+        asyncio.run(self.io.render_board(ChessBoard()))
+        full_frame = self.captured_output.getvalue()
+
+        asyncio.run(self.io.render_board(ChessBoard()))
+
+        self._assertOutput(full_frame + full_frame)
+
+    def test_render_message_BelowChangedTiles(self):
+        board = ChessBoard()
+        asyncio.run(self.io.render_board(board))
+        full_frame_len = len(self.captured_output.getvalue())
+
+        board.move_piece((4, 1), (4, 3))
+        asyncio.run(self.io.render_board(board))
+        asyncio.run(self.io.render_message('Invalid move'))
+
+        actual = self.captured_output.getvalue()[full_frame_len:]
+        self.assertEqual('\x1b[5;12HP\x1b[7;12H \x1b[11;1H\x1b[J'
+                         'Invalid move\n', actual)
+
 
 if __name__ == '__main__':
     unittest.main()
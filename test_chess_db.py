@@ -0,0 +1,100 @@
+import io
+import os
+import tempfile
+import unittest
+
+from chess_db import PositionIndex, get_position_key, index_game
+from chess_logic import *
+from chess_pgn import format_game
+
+_GAMES = [
+    ({'White': 'A', 'Black': 'B'}, ['f3', 'e5', 'g4', 'Qh4#'], '0-1'),
+    ({'White': 'C', 'Black': 'D'}, ['e4', 'e5', 'Qh5', 'Nc6', 'Bc4', 'Nf6',
+                                    'Qxf7#'], '1-0'),
+    ({'White': 'E', 'Black': 'F'}, ['e4', 'c5', 'Nf3'], '1/2-1/2')]
+
+
+def _get_pgn(games):
+    return ''.join(format_game(tags, san_moves, result)
+                   for tags, san_moves, result in games)
+
+
+class PositionIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'index.sqlite')
+        self.index = PositionIndex(self.path)  # Class Under Test
+
+    def tearDown(self):
+        self.index.close()
+        self.directory.cleanup()
+
+    def test_index_game_StopsAtIllegalMove(self):
+        rows = index_game(['e4', 'e5', 'O-O', 'Nc6'])
+
+        self.assertEqual(3, len(rows))
+        self.assertIsNone(rows[-1][2])
+
+    def test_get_position_key_SideToMove(self):
+        board = ChessBoard()
+
+        self.assertNotEqual(get_position_key(board, Colour.WHITE),
+                            get_position_key(board, Colour.BLACK))
+
+    def test_find_games_StartPosition(self):
+        self.index.build('games', io.StringIO(_get_pgn(_GAMES)), workers=0)
+
+        games = self.index.find_games(ChessBoard(), Colour.WHITE)
+
+        self.assertListEqual([(1, 0), (2, 0), (3, 0)], games)
+        self.assertEqual(('C', 'D', '1-0'), self.index.get_game(2))
+
+    def test_find_games_AfterMoves(self):
+        self.index.build('games', io.StringIO(_get_pgn(_GAMES)), workers=0)
+        board = ChessBoard()
+        board.make_move(encode_move((4, 1), (4, 3)))
+
+        games = self.index.find_games(board, Colour.BLACK)
+
+        self.assertListEqual([(2, 1), (3, 1)], games)
+        self.assertListEqual([], self.index.find_games(board, Colour.WHITE))
+
+    def test_get_move_stats_AfterE4(self):
+        self.index.build('games', io.StringIO(_get_pgn(_GAMES)), workers=0)
+        board = ChessBoard()
+        board.make_move(encode_move((4, 1), (4, 3)))
+
+        stats = self.index.get_move_stats(board, Colour.BLACK)
+
+        self.assertListEqual(
+            [(encode_move((2, 6), (2, 4)), 1, 0, 1, 0),
+             (encode_move((4, 6), (4, 4)), 1, 1, 0, 0)], stats)
+
+    def test_build_Resumes(self):
+        added = self.index.build('games', io.StringIO(_get_pgn(_GAMES[:2])),
+                                 workers=0, batch_size=1)
+        self.assertEqual(2, added)
+        self.index.close()
+
+        self.index = PositionIndex(self.path)
+        added = self.index.build('games', io.StringIO(_get_pgn(_GAMES)),
+                                 workers=0)
+
+        self.assertEqual(1, added)
+        self.assertEqual(3, self.index.get_indexed_count('games'))
+        self.assertEqual(3, len(self.index.find_games(ChessBoard(),
+                                                      Colour.WHITE)))
+
+    def test_build_ProcessPool(self):
+        added = self.index.build('games', io.StringIO(_get_pgn(_GAMES * 4)),
+                                 workers=2, batch_size=2)
+
+        self.assertEqual(12, added)
+        self.assertEqual(12, len(self.index.find_games(ChessBoard(),
+                                                       Colour.WHITE)))
+        self.assertEqual(('E', 'F', '1/2-1/2'), self.index.get_game(12))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+
+from chess_engine import ChessEngine, evaluate, static_exchange
+from chess_eval import PawnHashTable
+from chess_logic import *
+
+
+def add_piece(board, class_name, pos, colour):
+    piece_class = globals()[class_name]
+    piece = piece_class(pos, colour)
+    board.add_piece(piece)
+    return piece
+
+
+class ChessEngineTests(unittest.TestCase):
+
+    def setUp(self):
+        self.board = ChessBoard(layout='blank')
+        self.engine = ChessEngine(depth=2)  # Class Under Test
+
+    def test_evaluate_NewBoard(self):
+        board = ChessBoard()
+        self.assertEqual(0, evaluate(board, Colour.WHITE))
+
+    def test_evaluate_ExtraQueen(self):
+        add_piece(self.board, 'King', (4, 0), Colour.WHITE)
+        add_piece(self.board, 'Queen', (3, 0), Colour.WHITE)
+        add_piece(self.board, 'King', (4, 7), Colour.BLACK)
+
+        score = evaluate(self.board, Colour.WHITE)
+        self.assertTrue(850 < score < 950)
+        self.assertEqual(-score, evaluate(self.board, Colour.BLACK))
+
+    def test_evaluate_PrefersCentralKnight(self):
+        knight = add_piece(self.board, 'Knight', (0, 0), Colour.WHITE)
+        add_piece(self.board, 'Knight', (3, 3), Colour.BLACK)
+        cornered = evaluate(self.board, Colour.WHITE)
+
+        self.board.remove_piece(knight.pos)
+        add_piece(self.board, 'Knight', (4, 4), Colour.WHITE)
+
+        self.assertLess(cornered, evaluate(self.board, Colour.WHITE))
+
+    def test_evaluate_PawnTableHit(self):
+        board = ChessBoard()
+        table = PawnHashTable()
+        expected = evaluate(board, Colour.WHITE)
+
+        self.assertEqual(expected, evaluate(board, Colour.WHITE, table))
+        self.assertEqual(expected, evaluate(board, Colour.WHITE, table))
+        self.assertEqual(1, table.hits)
+        self.assertEqual(1, table.misses)
+
+    def test_choose_move_MateInOne(self):
+        add_piece(self.board, 'King', (6, 7), Colour.BLACK)
+        add_piece(self.board, 'Pawn', (5, 6), Colour.BLACK)
+        add_piece(self.board, 'Pawn', (6, 6), Colour.BLACK)
+        add_piece(self.board, 'Pawn', (7, 6), Colour.BLACK)
+        add_piece(self.board, 'King', (6, 0), Colour.WHITE)
+        add_piece(self.board, 'Rook', (0, 0), Colour.WHITE)
+
+        move = self.engine.choose_move(self.board, Colour.WHITE)
+
+        self.assertEqual(encode_move((0, 0), (0, 7)), move)
+
+    def test_choose_move_TakesHangingQueen(self):
+        add_piece(self.board, 'King', (0, 0), Colour.WHITE)
+        add_piece(self.board, 'Knight', (2, 2), Colour.WHITE)
+        add_piece(self.board, 'King', (7, 7), Colour.BLACK)
+        add_piece(self.board, 'Queen', (3, 4), Colour.BLACK)
+
+        move = self.engine.choose_move(self.board, Colour.WHITE)
+
+        self.assertEqual(encode_move((2, 2), (3, 4)), move)
+
+    def test_choose_move_LeavesBoardUnchanged(self):
+        board = ChessBoard()
+        before = [[type(tile) for tile in col] for col in board.get_tiles()]
+
+        self.engine.choose_move(board, Colour.WHITE)
+
+        after = [[type(tile) for tile in col] for col in board.get_tiles()]
+        self.assertListEqual(before, after)
+        self.assertEqual(0, len(board.move_list))
+
+    def test_choose_move_NoLegalMoves(self):
+        add_piece(self.board, 'King', (0, 0), Colour.WHITE)
+        add_piece(self.board, 'Queen', (1, 2), Colour.BLACK)
+        add_piece(self.board, 'King', (2, 1), Colour.BLACK)
+
+        self.assertEqual(
+            NO_MOVE, self.engine.choose_move(self.board, Colour.WHITE))
+
+    def test_static_exchange_UndefendedPiece(self):
+        add_piece(self.board, 'Rook', (0, 0), Colour.WHITE)
+        add_piece(self.board, 'Knight', (0, 5), Colour.BLACK)
+
+        move = encode_move((0, 0), (0, 5))
+        self.assertEqual(320, static_exchange(self.board, move))
+
+    def test_static_exchange_DefendedPawn(self):
+        add_piece(self.board, 'Queen', (3, 0), Colour.WHITE)
+        add_piece(self.board, 'Pawn', (3, 5), Colour.BLACK)
+        add_piece(self.board, 'Pawn', (2, 6), Colour.BLACK)
+
+        move = encode_move((3, 0), (3, 5))
+        self.assertEqual(100 - 900, static_exchange(self.board, move))
+
+    def test_static_exchange_XRayRecapture(self):
+        # Rooks doubled on the d file against a knight defended once
+        add_piece(self.board, 'Rook', (3, 0), Colour.WHITE)
+        add_piece(self.board, 'Rook', (3, 1), Colour.WHITE)
+        add_piece(self.board, 'Knight', (3, 5), Colour.BLACK)
+        add_piece(self.board, 'Rook', (3, 7), Colour.BLACK)
+
+        move = encode_move((3, 1), (3, 5))
+        self.assertEqual(320, static_exchange(self.board, move))
+
+    def test_static_exchange_XRayDefender(self):
+        add_piece(self.board, 'Rook', (3, 0), Colour.WHITE)
+        add_piece(self.board, 'Knight', (3, 5), Colour.BLACK)
+        add_piece(self.board, 'Rook', (3, 6), Colour.BLACK)
+        add_piece(self.board, 'Queen', (3, 7), Colour.BLACK)
+
+        move = encode_move((3, 0), (3, 5))
+        self.assertEqual(320 - 500, static_exchange(self.board, move))
+
+    def test_static_exchange_KingCantRecaptureDefended(self):
+        add_piece(self.board, 'Rook', (3, 0), Colour.WHITE)
+        add_piece(self.board, 'Rook', (3, 1), Colour.WHITE)
+        add_piece(self.board, 'Pawn', (3, 6), Colour.BLACK)
+        add_piece(self.board, 'King', (4, 7), Colour.BLACK)
+
+        move = encode_move((3, 1), (3, 6))
+        self.assertEqual(100, static_exchange(self.board, move))
+
+
+if __name__ == '__main__':
+    unittest.main()
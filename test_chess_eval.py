@@ -0,0 +1,80 @@
+import unittest
+
+from chess_eval import (
+    MATERIAL, PawnEntry, PawnHashTable, evaluate_pawn_shield,
+    evaluate_pawn_structure, get_square_values)
+
+
+class ChessEvalTests(unittest.TestCase):
+
+    def test_get_square_values_IncludesMaterial(self):
+        mg, eg = get_square_values('R', True)
+        # a1 has no piece-square bonus for a rook
+        self.assertEqual(MATERIAL['R'][0], mg[0])
+        self.assertEqual(MATERIAL['R'][1], eg[0])
+
+    def test_get_square_values_BlackMirrorsWhite(self):
+        for letter in MATERIAL:
+            white = get_square_values(letter, True)
+            black = get_square_values(letter, False)
+            for sq in range(0, 64):
+                mirrored = (7 - sq // 8) * 8 + sq % 8
+                self.assertEqual(white[0][sq], black[0][mirrored])
+                self.assertEqual(white[1][sq], black[1][mirrored])
+
+    def test_get_square_values_PawnsRewardedForAdvancing(self):
+        mg, eg = get_square_values('P', True)
+        # e2 against e7
+        self.assertLess(eg[12], eg[52])
+
+
+class PawnStructureTests(unittest.TestCase):
+
+    def test_evaluate_pawn_structure_Symmetric(self):
+        white = [(x, 1) for x in range(0, 8)]
+        black = [(x, 6) for x in range(0, 8)]
+        self.assertEqual((0, 0), evaluate_pawn_structure(white, black))
+
+    def test_evaluate_pawn_structure_DoubledAndIsolated(self):
+        healthy = evaluate_pawn_structure([(2, 1), (3, 1)], [(2, 6), (3, 6)])
+        doubled = evaluate_pawn_structure([(3, 1), (3, 2)], [(2, 6), (3, 6)])
+        self.assertLess(doubled[0], healthy[0])
+        self.assertLess(doubled[1], healthy[1])
+
+    def test_evaluate_pawn_structure_PassedPawn(self):
+        blocked = evaluate_pawn_structure([(0, 5)], [(1, 6)])
+        passed = evaluate_pawn_structure([(0, 5)], [(3, 6)])
+        self.assertGreater(passed[1], blocked[1])
+
+    def test_evaluate_pawn_shield_Normal(self):
+        pawns = [(5, 1), (6, 1), (7, 2)]
+        self.assertEqual(25, evaluate_pawn_shield((6, 0), pawns, True))
+        self.assertEqual(0, evaluate_pawn_shield((2, 0), pawns, True))
+
+
+class PawnHashTableTests(unittest.TestCase):
+
+    def setUp(self):
+        self.table = PawnHashTable(size=8)  # Class Under Test
+        self.entry = PawnEntry([(0, 1)], [(0, 6)])
+
+    def test_probe_HitAfterStore(self):
+        self.assertIsNone(self.table.probe(42))
+        self.table.store(42, self.entry)
+
+        self.assertIs(self.entry, self.table.probe(42))
+        self.assertEqual(1, self.table.hits)
+        self.assertEqual(1, self.table.misses)
+        self.assertEqual(0.5, self.table.get_hit_rate())
+
+    def test_store_ReplacesSameSlot(self):
+        other = PawnEntry([(1, 1)], [(1, 6)])
+        self.table.store(3, self.entry)
+        self.table.store(3 + 8, other)
+
+        self.assertIsNone(self.table.probe(3))
+        self.assertIs(other, self.table.probe(3 + 8))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import io
+import os
+import tempfile
+import unittest
+
+from chess_export import (
+    ShardWriter, export_games, get_feature_planes, numpy, sample_game)
+from chess_logic import *
+from chess_pgn import format_game
+
+_FOOLS_MATE = ['f3', 'e5', 'g4', 'Qh4#']
+
+
+class ChessExportTests(unittest.TestCase):
+
+    def test_sample_game_AllPositions(self):
+        codes, moves, turns, values = sample_game(_FOOLS_MATE, '0-1')
+
+        self.assertEqual(4 * 64, len(codes))
+        self.assertEqual(encode_board(ChessBoard()), codes[:64])
+        self.assertEqual(encode_move((5, 1), (5, 2)), moves[0])
+        self.assertListEqual([0, 1, 0, 1], list(turns))
+        self.assertListEqual([-1, 1, -1, 1], list(values))
+
+    def test_sample_game_SampleRate(self):
+        _, moves, _, _ = sample_game(_FOOLS_MATE, '0-1', sample_rate=0)
+
+        self.assertEqual(0, len(moves))
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class ShardWriterTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_get_feature_planes_StartPosition(self):
+        planes = get_feature_planes(encode_board(ChessBoard()))
+
+        self.assertEqual((1, 12, 8, 8), planes.shape)
+        # White pawns fill rank 2, black's king is on e8
+        self.assertEqual(8, planes[0, 0, 1].sum())
+        self.assertEqual(1, planes[0, 11, 7, 4])
+        self.assertEqual(32, planes.sum())
+
+    def test_export_games_FixedSizeShards(self):
+        pgn = format_game({}, _FOOLS_MATE, '0-1') * 5
+        writer = ShardWriter(self.directory.name, shard_size=8)
+
+        count = export_games(io.StringIO(pgn), writer, workers=0,
+                             batch_size=2)
+
+        self.assertEqual(20, count)
+        self.assertEqual(3, len(writer.paths))
+        sizes = []
+        for path in writer.paths:
+            with numpy.load(path) as shard:
+                sizes.append(len(shard['moves']))
+                self.assertEqual((len(shard['moves']), 12, 8, 8),
+                                 shard['planes'].shape)
+        self.assertListEqual([8, 8, 4], sizes)
+
+    def test_export_games_SkipsUnfinished(self):
+        pgn = format_game({}, _FOOLS_MATE, '*')
+        writer = ShardWriter(self.directory.name)
+
+        self.assertEqual(0, export_games(io.StringIO(pgn), writer, workers=0))
+        self.assertListEqual([], os.listdir(self.directory.name))
+
+    def test_export_games_ProcessPool(self):
+        pgn = format_game({}, _FOOLS_MATE, '0-1') * 6
+        writer = ShardWriter(self.directory.name, shard_size=10)
+
+        count = export_games(io.StringIO(pgn), writer, workers=2,
+                             batch_size=1)
+
+        self.assertEqual(24, count)
+        with numpy.load(writer.paths[0]) as shard:
+            self.assertListEqual([-1, 1, -1, 1], list(shard['values'][:4]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,7 @@
+import asyncio
+import pickle
 import unittest
+from array import array
 
 from chess_logic import *
 
@@ -6,9 +9,7 @@ from chess_logic import *
 def add_piece(board, class_name, pos, colour):
     piece_class = globals()[class_name]
     piece = piece_class(pos, colour)
-    board.get_tiles()[pos[0]][pos[1]] = piece
-    if type(piece) is King:
-        board.king_pos_dict[piece.colour] = pos
+    board.add_piece(piece)
     return piece
 
 
@@ -67,11 +68,453 @@ class ChessBoardTests(unittest.TestCase):
         actual = self.board.is_in_check(Colour.BLACK)
         self.assertEqual(expected, actual)
 
-    # def test_is_in_check_Checkmate(self):
-    #     pass
-    #
-    # def test_is_in_check_AvoidMateByTaking(self):
-    #     pass
+    def test_get_pieces_NewBoard(self):
+        board = ChessBoard()
+
+        self.assertEqual(16, len(board.get_pieces(Colour.WHITE)))
+        self.assertEqual(16, len(board.get_pieces(Colour.BLACK)))
+        self.assertEqual(8, len(board.get_pieces(Colour.WHITE, Pawn)))
+        self.assertEqual((4, 0), board.king_pos_dict[Colour.WHITE])
+        self.assertEqual((4, 7), board.king_pos_dict[Colour.BLACK])
+
+    def test_get_pieces_ByType(self):
+        rook = add_piece(self.board, 'Rook', (0, 0), Colour.WHITE)
+        _ = add_piece(self.board, 'Bishop', (2, 0), Colour.WHITE)
+
+        self.assertListEqual([rook], self.board.get_pieces(Colour.WHITE, Rook))
+        self.assertListEqual([], self.board.get_pieces(Colour.WHITE, Queen))
+
+    def test_move_piece_UpdatesPieceIndex(self):
+        rook = add_piece(self.board, 'Rook', (0, 0), Colour.WHITE)
+        _ = add_piece(self.board, 'Knight', (0, 5), Colour.BLACK)
+        success = self.board.move_piece((0, 0), (0, 5))
+
+        self.assertTrue(success)
+        self.assertListEqual([rook], self.board.get_pieces(Colour.WHITE))
+        self.assertListEqual([], self.board.get_pieces(Colour.BLACK))
+
+    def test_remove_piece_Normal(self):
+        piece = add_piece(self.board, 'Queen', (3, 3), Colour.BLACK)
+
+        self.assertEqual(piece, self.board.remove_piece((3, 3)))
+        self.assertIsNone(self.board_tiles[3][3])
+        self.assertListEqual([], self.board.get_pieces(Colour.BLACK))
+
+    def test_get_check_info_Pin(self):
+        add_piece(self.board, 'King', (4, 0), Colour.WHITE)
+        add_piece(self.board, 'Bishop', (4, 2), Colour.WHITE)
+        add_piece(self.board, 'Rook', (4, 6), Colour.BLACK)
+
+        info = self.board.get_check_info(Colour.WHITE)
+
+        self.assertListEqual([], info.checkers)
+        self.assertIsNone(info.check_mask)
+        self.assertSetEqual({(4, 1), (4, 2), (4, 3), (4, 4), (4, 5), (4, 6)},
+                            info.pins[(4, 2)])
+
+    def test_get_check_info_SingleCheck(self):
+        add_piece(self.board, 'King', (4, 0), Colour.WHITE)
+        add_piece(self.board, 'Bishop', (7, 3), Colour.BLACK)
+
+        info = self.board.get_check_info(Colour.WHITE)
+
+        self.assertListEqual([(7, 3)], info.checkers)
+        self.assertSetEqual({(5, 1), (6, 2), (7, 3)}, info.check_mask)
+
+    def test_get_check_info_DoubleCheck(self):
+        add_piece(self.board, 'King', (4, 0), Colour.WHITE)
+        add_piece(self.board, 'Rook', (4, 5), Colour.BLACK)
+        add_piece(self.board, 'Knight', (3, 2), Colour.BLACK)
+
+        info = self.board.get_check_info(Colour.WHITE)
+
+        self.assertEqual(2, len(info.checkers))
+        self.assertSetEqual(set(), info.check_mask)
+
+    def test_get_attackers_XRay(self):
+        pawn = add_piece(self.board, 'Pawn', (2, 2), Colour.WHITE)
+        bishop = add_piece(self.board, 'Bishop', (0, 0), Colour.WHITE)
+        knight = add_piece(self.board, 'Knight', (5, 4), Colour.WHITE)
+        add_piece(self.board, 'Rook', (3, 7), Colour.BLACK)
+
+        attackers = self.board.get_attackers((3, 3), Colour.WHITE)
+        self.assertCountEqual([pawn, knight], attackers)
+
+        attackers = self.board.get_attackers(
+            (3, 3), Colour.WHITE, {(2, 2), (5, 4)})
+        self.assertListEqual([bishop], attackers)
+
+    def test_move_piece_PinnedPiece(self):
+        add_piece(self.board, 'King', (4, 0), Colour.WHITE)
+        piece = add_piece(self.board, 'Bishop', (4, 2), Colour.WHITE)
+        add_piece(self.board, 'Rook', (4, 6), Colour.BLACK)
+        success = self.board.move_piece((4, 2), (5, 3))
+
+        self.assertFalse(success)
+        self.assertEqual(piece, self.board_tiles[4][2])
+
+    def test_move_piece_MustBlockCheck(self):
+        add_piece(self.board, 'King', (4, 0), Colour.WHITE)
+        add_piece(self.board, 'Rook', (0, 3), Colour.WHITE)
+        add_piece(self.board, 'Rook', (4, 6), Colour.BLACK)
+
+        self.assertFalse(self.board.move_piece((0, 3), (0, 4)))
+        self.assertTrue(self.board.move_piece((0, 3), (4, 3)))
+
+    def test_get_legal_moves_Promotions(self):
+        add_piece(self.board, 'Pawn', (0, 6), Colour.WHITE)
+        moves = self.board.get_legal_moves(Colour.WHITE)
+
+        promotions = sorted(get_move_promotion(move).__name__
+                            for move in moves)
+        self.assertListEqual(['Bishop', 'Knight', 'Queen', 'Rook'],
+                             promotions)
+
+    def test_get_legal_moves_PackedArray(self):
+        board = ChessBoard()
+        moves = board.get_legal_moves(Colour.WHITE)
+
+        self.assertEqual('H', moves.typecode)
+        self.assertIn(encode_move((4, 1), (4, 3)), moves)
+
+    def test_encode_move_RoundTrip(self):
+        move = encode_move((1, 6), (0, 7), Rook)
+
+        self.assertEqual(((1, 6), (0, 7)), decode_move(move))
+        self.assertEqual((1, 6), get_move_from(move))
+        self.assertEqual((0, 7), get_move_to(move))
+        self.assertIs(Rook, get_move_promotion(move))
+        self.assertLess(move, 1 << 16)
+
+    def test_encode_board_StartPosition(self):
+        codes = encode_board(ChessBoard())
+
+        self.assertEqual(64, len(codes))
+        # a1 white rook, e1 white king, e8 black king, e4 empty
+        self.assertEqual(4, codes[0])
+        self.assertEqual(6, codes[4])
+        self.assertEqual(12, codes[60])
+        self.assertEqual(0, codes[28])
+
+    def test_decode_board_RoundTrip(self):
+        board = ChessBoard()
+        board.make_move(encode_move((4, 1), (4, 3)))
+
+        copy = decode_board(encode_board(board))
+
+        self.assertEqual(board.hash, copy.hash)
+        self.assertEqual(board.mg_score, copy.mg_score)
+        self.assertEqual((4, 7), copy.king_pos_dict[Colour.BLACK])
+
+    def test_move_piece_UnderPromotion(self):
+        add_piece(self.board, 'Pawn', (0, 6), Colour.WHITE)
+        success = self.board.move_piece((0, 6), (0, 7), Knight)
+
+        self.assertTrue(success)
+        self.assertIs(Knight, type(self.board_tiles[0][7]))
+        self.assertEqual(encode_move((0, 6), (0, 7), Knight),
+                         self.board.get_last_move())
+
+    def test_get_legal_moves_NewBoard(self):
+        board = ChessBoard()
+        self.assertEqual(20, len(board.get_legal_moves(Colour.WHITE)))
+        self.assertEqual(20, len(board.get_legal_moves(Colour.BLACK)))
+
+    def test_get_legal_moves_EnPassantExposesKing(self):
+        add_piece(self.board, 'King', (0, 4), Colour.WHITE)
+        add_piece(self.board, 'Pawn', (4, 4), Colour.WHITE)
+        add_piece(self.board, 'Pawn', (3, 4), Colour.BLACK)
+        add_piece(self.board, 'Rook', (7, 4), Colour.BLACK)
+        self.board.move_list.append(encode_move((3, 6), (3, 4)))
+
+        moves = self.board.get_legal_moves(Colour.WHITE)
+
+        self.assertNotIn(
+            encode_move((4, 4), (3, 5), flags=EN_PASSANT_FLAG), moves)
+        self.assertIn(encode_move((4, 4), (4, 5)), moves)
+
+    def test_make_move_EnPassantCapture(self):
+        add_piece(self.board, 'Pawn', (4, 4), Colour.WHITE)
+        captured = add_piece(self.board, 'Pawn', (3, 6), Colour.BLACK)
+        self.board.make_move(encode_move((3, 6), (3, 4)))
+        self.board.make_move(self.board.find_move((4, 4), (3, 5)))
+
+        self.assertIsNone(self.board_tiles[3][4])
+        self.assertListEqual([], self.board.get_pieces(Colour.BLACK))
+
+        self.board.unmake_move()
+        self.assertEqual(captured, self.board_tiles[3][4])
+        self.assertEqual(1, len(self.board.move_list))
+
+    def test_make_move_PromotesToQueen(self):
+        pawn = add_piece(self.board, 'Pawn', (0, 6), Colour.WHITE)
+        self.board.make_move(encode_move((0, 6), (0, 7), Queen))
+
+        self.assertIs(Queen, type(self.board_tiles[0][7]))
+
+        self.board.unmake_move()
+        self.assertEqual(pawn, self.board_tiles[0][6])
+        self.assertEqual((0, 6), pawn.pos)
+        self.assertListEqual([], self.board.get_pieces(Colour.WHITE, Queen))
+
+    def test_make_move_EvalTermsMatchRescan(self):
+        board = ChessBoard()
+        moves = [((4, 1), (4, 3)), ((3, 6), (3, 4)), ((4, 3), (3, 4)),
+                 ((3, 7), (3, 4)), ((1, 0), (2, 2)), ((3, 4), (0, 1))]
+        for old_pos, new_pos in moves:
+            self.assertTrue(board.move_piece(old_pos, new_pos))
+            self.__assertEvalTermsMatchRescan(board)
+
+        for _ in moves:
+            board.unmake_move()
+        self.__assertEvalTermsMatchRescan(board)
+        self.assertEqual(24, board.phase)
+
+    def __assertEvalTermsMatchRescan(self, board):
+        rescan = ChessBoard(layout='blank')
+        for colour in Colour:
+            for piece in board.get_pieces(colour):
+                rescan.add_piece(type(piece)(piece.pos, colour))
+        self.assertEqual(
+            (rescan.mg_score, rescan.eg_score, rescan.phase),
+            (board.mg_score, board.eg_score, board.phase))
+
+    def test_pawn_hash_OnlyPawnsChangeIt(self):
+        board = ChessBoard()
+        start_hash = board.pawn_hash
+
+        board.move_piece((6, 0), (5, 2))
+        self.assertEqual(start_hash, board.pawn_hash)
+
+        board.move_piece((4, 6), (4, 4))
+        self.assertNotEqual(start_hash, board.pawn_hash)
+
+        board.unmake_move()
+        self.assertEqual(start_hash, board.pawn_hash)
+
+    def test_pawn_hash_SameStructureSameHash(self):
+        board_1 = ChessBoard()
+        board_1.move_piece((4, 1), (4, 3))
+        board_1.move_piece((3, 6), (3, 5))
+
+        board_2 = ChessBoard()
+        board_2.move_piece((4, 1), (4, 2))
+        board_2.move_piece((3, 6), (3, 5))
+        board_2.move_piece((4, 2), (4, 3))
+
+        self.assertEqual(board_1.pawn_hash, board_2.pawn_hash)
+
+    def test_hash_TranspositionsMatch(self):
+        board_1 = ChessBoard()
+        board_1.move_piece((6, 0), (5, 2))
+        board_1.move_piece((6, 7), (5, 5))
+        board_1.move_piece((1, 0), (2, 2))
+
+        board_2 = ChessBoard()
+        board_2.move_piece((1, 0), (2, 2))
+        board_2.move_piece((6, 7), (5, 5))
+        board_2.move_piece((6, 0), (5, 2))
+
+        self.assertEqual(board_1.hash, board_2.hash)
+        self.assertNotEqual(ChessBoard().hash, board_1.hash)
+
+    def test_hash_RestoredByUnmake(self):
+        board = ChessBoard()
+        start_hash = board.hash
+        board.move_piece((4, 1), (4, 3))
+        board.unmake_move()
+        self.assertEqual(start_hash, board.hash)
+
+    def test_is_checkmate_BackRank(self):
+        add_piece(self.board, 'King', (6, 0), Colour.WHITE)
+        add_piece(self.board, 'Pawn', (5, 1), Colour.WHITE)
+        add_piece(self.board, 'Pawn', (6, 1), Colour.WHITE)
+        add_piece(self.board, 'Pawn', (7, 1), Colour.WHITE)
+        add_piece(self.board, 'Rook', (0, 0), Colour.BLACK)
+
+        self.assertTrue(self.board.is_checkmate(Colour.WHITE))
+
+    def test_is_checkmate_AvoidMateByTaking(self):
+        add_piece(self.board, 'King', (6, 0), Colour.WHITE)
+        add_piece(self.board, 'Pawn', (5, 1), Colour.WHITE)
+        add_piece(self.board, 'Pawn', (6, 1), Colour.WHITE)
+        add_piece(self.board, 'Pawn', (7, 1), Colour.WHITE)
+        add_piece(self.board, 'Rook', (0, 5), Colour.WHITE)
+        add_piece(self.board, 'Rook', (0, 0), Colour.BLACK)
+
+        self.assertFalse(self.board.is_checkmate(Colour.WHITE))
+
+    def test_is_bare_kings_OnlyKings(self):
+        add_piece(self.board, 'King', (4, 0), Colour.WHITE)
+        add_piece(self.board, 'King', (4, 7), Colour.BLACK)
+
+        self.assertTrue(self.board.is_bare_kings())
+
+    def test_is_bare_kings_PawnLeft(self):
+        add_piece(self.board, 'King', (4, 0), Colour.WHITE)
+        add_piece(self.board, 'King', (4, 7), Colour.BLACK)
+        add_piece(self.board, 'Pawn', (0, 6), Colour.BLACK)
+
+        self.assertFalse(self.board.is_bare_kings())
+
+
+class MoveCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = MoveCache(max_size=2)  # Class Under Test
+
+    def test_get_legal_moves_CachedAfterFirstCall(self):
+        board = ChessBoard(move_cache=self.cache)
+        first = board.get_legal_moves(Colour.WHITE)
+        second = board.get_legal_moves(Colour.WHITE)
+
+        self.assertEqual(first, second)
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(1, self.cache.misses)
+        self.assertEqual(0.5, self.cache.get_hit_rate())
+
+    def test_get_legal_moves_KeyedByColour(self):
+        board = ChessBoard(move_cache=self.cache)
+        white_moves = board.get_legal_moves(Colour.WHITE)
+        black_moves = board.get_legal_moves(Colour.BLACK)
+
+        self.assertNotEqual(white_moves, black_moves)
+        self.assertEqual(0, self.cache.hits)
+
+    def test_get_legal_moves_SharedBetweenBoards(self):
+        board_1 = ChessBoard(move_cache=self.cache)
+        board_2 = ChessBoard(move_cache=self.cache)
+        board_1.get_legal_moves(Colour.WHITE)
+        board_2.get_legal_moves(Colour.WHITE)
+
+        self.assertEqual(1, self.cache.hits)
+
+    def test_get_legal_moves_EnPassantNotConfused(self):
+        board = ChessBoard(layout='blank', move_cache=self.cache)
+        board.add_piece(King((0, 0), Colour.WHITE))
+        board.add_piece(King((7, 7), Colour.BLACK))
+        board.add_piece(Pawn((4, 4), Colour.WHITE))
+        board.add_piece(Pawn((3, 6), Colour.BLACK))
+        board.make_move(encode_move((3, 6), (3, 4)))
+        with_ep = board.get_legal_moves(Colour.WHITE)
+
+        # Same pieces, but reached without a double step
+        board.add_piece(Pawn((3, 5), Colour.BLACK))
+        board.make_move(encode_move((3, 5), (3, 4)))
+
+        self.assertEqual(len(with_ep) - 1,
+                         len(board.get_legal_moves(Colour.WHITE)))
+
+    def test_put_EvictsLeastRecentlyUsed(self):
+        self.cache.put('a', array('H', [1]))
+        self.cache.put('b', array('H', [2]))
+        self.cache.get('a')
+        self.cache.put('c', array('H', [3]))
+
+        self.assertEqual(2, len(self.cache))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(array('H', [1]), self.cache.get('a'))
+
+    def test_pickle_BoardGetsEmptyCache(self):
+        board = ChessBoard(move_cache=self.cache)
+        board.get_legal_moves(Colour.WHITE)
+
+        copied = pickle.loads(pickle.dumps(board))
+
+        self.assertEqual(20, len(copied.get_legal_moves(Colour.WHITE)))
+        self.assertEqual(1, len(self.cache))
+
+    def test_get_ReturnsCopy(self):
+        self.cache.put('a', array('H', [1]))
+        self.cache.get('a').append(2)
+
+        self.assertEqual(array('H', [1]), self.cache.get('a'))
+
+
+class _ScriptedIO(ChessIO):
+    """
+    ChessIO replaying canned menu choices and moves.
+    """
+    def __init__(self, menu_inputs, move_inputs):
+        self.menu_inputs = list(menu_inputs)
+        self.move_inputs = list(move_inputs)
+        self.messages = []
+        self.render_count = 0
+
+    async def get_menu_input(self, options):
+        return self.menu_inputs.pop(0)
+
+    async def get_move_input(self):
+        # Yield to the loop like a real client waiting on input would
+        await asyncio.sleep(0)
+        return self.move_inputs.pop(0)
+
+    async def render_board(self, board):
+        self.render_count += 1
+
+    async def render_message(self, message):
+        self.messages.append(message)
+
+
+FOOLS_MATE = [((5, 1), (5, 2)), ((4, 6), (4, 4)),
+              ((6, 1), (6, 3)), ((3, 7), (7, 3))]
+
+
+class ChessRunnerTests(unittest.TestCase):
+
+    def test_run_MultiPlayerThenQuit(self):
+        io = _ScriptedIO([1, 2], FOOLS_MATE)
+        runner = ChessRunner(io)
+
+        asyncio.run(runner.run())
+
+        self.assertListEqual(['Checkmate, black wins.'], io.messages)
+        self.assertEqual(5, io.render_count)
+
+    def test_play_game_InvalidMoveRetried(self):
+        io = _ScriptedIO([], [((4, 1), (4, 5))] + FOOLS_MATE)
+        runner = ChessRunner(io)
+
+        winner = asyncio.run(runner.play_game(GameType.MULTI_PLAYER))
+
+        self.assertIs(Colour.BLACK, winner)
+        self.assertEqual('Invalid move', io.messages[0])
+
+    def test_play_game_ManyConcurrentGames(self):
+        ios = [_ScriptedIO([], FOOLS_MATE) for _ in range(50)]
+
+        async def play_all():
+            return await asyncio.gather(
+                *[ChessRunner(io).play_game(GameType.MULTI_PLAYER)
+                  for io in ios])
+
+        winners = asyncio.run(play_all())
+
+        self.assertListEqual([Colour.BLACK] * 50, winners)
+
+    def test_play_game_SinglePlayerEngineReplies(self):
+        io = _ScriptedIO([], FOOLS_MATE[0::2])
+        runner = ChessRunner(io, engine=_MateEngine())
+
+        winner = asyncio.run(runner.play_game(GameType.SINGLE_PLAYER))
+
+        self.assertIs(Colour.BLACK, winner)
+
+    def test_run_MctsEngineChosen(self):
+        io = _ScriptedIO([2, 2, 2], FOOLS_MATE[0::2])
+        runner = ChessRunner(io, engine=object(), mcts_engine=_MateEngine())
+
+        asyncio.run(runner.run())
+
+        self.assertListEqual(['Checkmate, black wins.'], io.messages)
+
+
+class _MateEngine(object):
+    """
+    Stand-in engine playing black's side of fool's mate.
+    """
+    def choose_move(self, board, colour):
+        return encode_move(*FOOLS_MATE[len(board.move_list)])
 
 
 class ChessPieceTests(unittest.TestCase):
@@ -397,10 +840,17 @@ class PawnTests(ChessPieceTests):
         avail_moves = sorted(piece.get_moves(self.board, prev_move=(-1, -1)))
         self.assertListEqual(expected_moves, avail_moves)
 
+    def test_get_moves_OneStepFromPromotion(self):
+        piece = add_piece(self.board, 'Pawn', (7, 1), Colour.BLACK)
+        _ = add_piece(self.board, 'Pawn', (6, 1), Colour.WHITE)
+        avail_moves = piece.get_moves(self.board, prev_move=NO_MOVE)
+        self.assertListEqual([(7, 0)], avail_moves)
+
     def test_get_moves_EnPassant(self):
         piece = add_piece(self.board, 'Pawn', (4, 4), Colour.WHITE)
         _ = add_piece(self.board, 'Pawn', (3, 4), Colour.BLACK)
-        avail_moves = piece.get_moves(self.board, prev_move=((3, 6), (3, 4)))
+        avail_moves = piece.get_moves(
+            self.board, prev_move=encode_move((3, 6), (3, 4)))
         self.assertIn((3, 5), avail_moves)
 
 
@@ -0,0 +1,141 @@
+import pickle
+import threading
+import unittest
+
+from chess_logic import *
+from chess_mcts import MctsEngine
+
+
+def add_piece(board, class_name, pos, colour):
+    piece_class = globals()[class_name]
+    piece = piece_class(pos, colour)
+    board.add_piece(piece)
+    return piece
+
+
+class MctsEngineTests(unittest.TestCase):
+
+    def setUp(self):
+        self.board = ChessBoard(layout='blank')
+        self.engine = MctsEngine(playouts=300, workers=0)  # Class Under Test
+
+    def tearDown(self):
+        self.engine.close()
+
+    def test_choose_move_TakesHangingQueen(self):
+        add_piece(self.board, 'King', (0, 0), Colour.WHITE)
+        add_piece(self.board, 'Knight', (2, 2), Colour.WHITE)
+        add_piece(self.board, 'King', (7, 7), Colour.BLACK)
+        add_piece(self.board, 'Queen', (3, 4), Colour.BLACK)
+
+        move = self.engine.choose_move(self.board, Colour.WHITE)
+
+        self.assertEqual(encode_move((2, 2), (3, 4)), move)
+
+    def test_choose_move_MateInOne(self):
+        add_piece(self.board, 'King', (6, 7), Colour.BLACK)
+        add_piece(self.board, 'Pawn', (5, 6), Colour.BLACK)
+        add_piece(self.board, 'Pawn', (6, 6), Colour.BLACK)
+        add_piece(self.board, 'Pawn', (7, 6), Colour.BLACK)
+        add_piece(self.board, 'King', (6, 0), Colour.WHITE)
+        add_piece(self.board, 'Rook', (0, 0), Colour.WHITE)
+
+        move = self.engine.choose_move(self.board, Colour.WHITE)
+
+        self.assertEqual(encode_move((0, 0), (0, 7)), move)
+
+    def test_choose_move_LeavesBoardUnchanged(self):
+        board = ChessBoard()
+
+        self.engine.choose_move(board, Colour.WHITE)
+
+        self.assertEqual(ChessBoard().hash, board.hash)
+        self.assertEqual(0, len(board.move_list))
+
+    def test_choose_move_NoLegalMoves(self):
+        add_piece(self.board, 'King', (0, 0), Colour.WHITE)
+        add_piece(self.board, 'Queen', (1, 2), Colour.BLACK)
+        add_piece(self.board, 'King', (2, 1), Colour.BLACK)
+
+        self.assertEqual(
+            NO_MOVE, self.engine.choose_move(self.board, Colour.WHITE))
+
+    def test_choose_move_NoTimeLimit(self):
+        engine = MctsEngine(playouts=300, workers=0, time_limit=0)
+        board = ChessBoard()
+
+        move = engine.choose_move(board, Colour.WHITE)
+
+        self.assertIn(move, board.get_legal_moves(Colour.WHITE))
+
+    def test_choose_move_NoPlayouts(self):
+        engine = MctsEngine(playouts=0, workers=0)
+        board = ChessBoard()
+
+        move = engine.choose_move(board, Colour.WHITE)
+
+        self.assertIn(move, board.get_legal_moves(Colour.WHITE))
+        self.assertEqual(1, engine.get_root_visits())
+
+    def test_choose_move_ConcurrentCallsTakeTurns(self):
+        board_a = ChessBoard()
+        board_b = ChessBoard()
+        board_b.make_move(board_b.get_legal_moves(Colour.WHITE)[0])
+        moves = {}
+
+        def choose(board, colour):
+            moves[colour] = self.engine.choose_move(board, colour)
+
+        threads = [
+            threading.Thread(target=choose, args=(board_a, Colour.WHITE)),
+            threading.Thread(target=choose, args=(board_b, Colour.BLACK))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertIn(moves[Colour.WHITE],
+                      board_a.get_legal_moves(Colour.WHITE))
+        self.assertIn(moves[Colour.BLACK],
+                      board_b.get_legal_moves(Colour.BLACK))
+
+    def test_choose_move_ReusesTree(self):
+        board = ChessBoard()
+        board.make_move(self.engine.choose_move(board, Colour.WHITE))
+        board.make_move(board.get_legal_moves(Colour.BLACK)[0])
+
+        self.engine.choose_move(board, Colour.WHITE)
+
+        self.assertGreater(self.engine.get_root_visits(), 300)
+
+    def test_choose_move_NewGameStartsFresh(self):
+        board = ChessBoard()
+        self.engine.choose_move(board, Colour.WHITE)
+
+        self.engine.choose_move(ChessBoard(), Colour.WHITE)
+
+        self.assertEqual(600, self.engine.get_root_visits())
+        self.engine.choose_move(self.board, Colour.WHITE)
+        self.assertEqual(300, self.engine.get_root_visits())
+
+    def test_choose_move_ProcessPool(self):
+        engine = MctsEngine(playouts=32, batch_size=8, workers=2)
+        try:
+            move = engine.choose_move(ChessBoard(), Colour.WHITE)
+        finally:
+            engine.close()
+
+        self.assertIn(move, ChessBoard().get_legal_moves(Colour.WHITE))
+        self.assertEqual(32, engine.get_root_visits())
+
+    def test_pickle_DropsTree(self):
+        self.engine.choose_move(ChessBoard(), Colour.WHITE)
+
+        copy = pickle.loads(pickle.dumps(self.engine))
+
+        self.assertEqual(0, copy.get_root_visits())
+        self.assertEqual(300, copy.playouts)
+
+
+if __name__ == '__main__':
+    unittest.main()
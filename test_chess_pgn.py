@@ -0,0 +1,153 @@
+import io
+import unittest
+
+from chess_logic import *
+from chess_pgn import (
+    format_game, get_batches, map_batches, move_to_san, parse_san,
+    read_games, square_name)
+
+
+def add_piece(board, class_name, pos, colour):
+    piece_class = globals()[class_name]
+    piece = piece_class(pos, colour)
+    board.add_piece(piece)
+    return piece
+
+
+class ChessPgnTests(unittest.TestCase):
+
+    def setUp(self):
+        self.board = ChessBoard(layout='blank')
+
+    def test_square_name_Corners(self):
+        self.assertEqual('a1', square_name((0, 0)))
+        self.assertEqual('h8', square_name((7, 7)))
+
+    def test_move_to_san_FoolsMate(self):
+        board = ChessBoard()
+        moves = [((5, 1), (5, 2)), ((4, 6), (4, 4)),
+                 ((6, 1), (6, 3)), ((3, 7), (7, 3))]
+        colour = Colour.WHITE
+        san_moves = []
+        for move in moves:
+            move = encode_move(*move)
+            san_moves.append(move_to_san(board, colour, move))
+            board.make_move(move)
+            colour = colour.opponent()
+
+        self.assertListEqual(['f3', 'e5', 'g4', 'Qh4#'], san_moves)
+
+    def test_move_to_san_CaptureAndCheck(self):
+        add_piece(self.board, 'King', (4, 0), Colour.WHITE)
+        add_piece(self.board, 'Knight', (2, 2), Colour.WHITE)
+        add_piece(self.board, 'King', (2, 7), Colour.BLACK)
+        add_piece(self.board, 'Pawn', (3, 4), Colour.BLACK)
+
+        san = move_to_san(
+            self.board, Colour.WHITE, encode_move((2, 2), (3, 4)))
+
+        self.assertEqual('Nxd5', san)
+
+    def test_move_to_san_DisambiguateByFile(self):
+        add_piece(self.board, 'King', (4, 0), Colour.WHITE)
+        add_piece(self.board, 'Rook', (0, 3), Colour.WHITE)
+        add_piece(self.board, 'Rook', (7, 3), Colour.WHITE)
+        add_piece(self.board, 'King', (4, 7), Colour.BLACK)
+
+        san = move_to_san(
+            self.board, Colour.WHITE, encode_move((0, 3), (3, 3)))
+
+        self.assertEqual('Rad4', san)
+
+    def test_move_to_san_PawnCaptureAndPromotion(self):
+        add_piece(self.board, 'King', (4, 0), Colour.WHITE)
+        add_piece(self.board, 'Pawn', (1, 6), Colour.WHITE)
+        add_piece(self.board, 'Rook', (0, 7), Colour.BLACK)
+        add_piece(self.board, 'King', (7, 5), Colour.BLACK)
+
+        move = encode_move((1, 6), (0, 7), Knight)
+        san = move_to_san(self.board, Colour.WHITE, move)
+
+        self.assertEqual('bxa8=N', san)
+
+    def test_format_game_Normal(self):
+        text = format_game({'White': 'A', 'Black': 'B'},
+                           ['f3', 'e5', 'g4', 'Qh4#'], '0-1')
+
+        expected = '[Event "?"]\n[Site "?"]\n[Date "?"]\n[Round "?"]\n' \
+                   '[White "A"]\n[Black "B"]\n[Result "0-1"]\n\n' \
+                   '1. f3 e5 2. g4 Qh4# 0-1\n\n'
+        self.assertEqual(expected, text)
+
+    def test_format_game_WrapsLongLines(self):
+        text = format_game({}, ['Nf3', 'Nf6', 'Ng1', 'Ng8'] * 20, '1/2-1/2')
+
+        for line in text.splitlines():
+            self.assertLess(len(line), 80)
+
+    def test_parse_san_Disambiguation(self):
+        add_piece(self.board, 'Rook', (0, 0), Colour.WHITE)
+        add_piece(self.board, 'Rook', (7, 0), Colour.WHITE)
+
+        move = parse_san(self.board, Colour.WHITE, 'Rhd1')
+
+        self.assertEqual(encode_move((7, 0), (3, 0)), move)
+
+    def test_parse_san_Promotion(self):
+        add_piece(self.board, 'Pawn', (1, 6), Colour.WHITE)
+        add_piece(self.board, 'Rook', (0, 7), Colour.BLACK)
+
+        move = parse_san(self.board, Colour.WHITE, 'bxa8=N+')
+
+        self.assertEqual(encode_move((1, 6), (0, 7), Knight), move)
+
+    def test_parse_san_Illegal(self):
+        board = ChessBoard()
+
+        self.assertEqual(NO_MOVE, parse_san(board, Colour.WHITE, 'e5'))
+        self.assertEqual(NO_MOVE, parse_san(board, Colour.WHITE, 'O-O'))
+
+    def test_read_games_SkipsCommentsAndVariations(self):
+        pgn = ('[White "A"]\n[Result "1-0"]\n\n'
+               '1. e4 {best by test} e5 (1... c5 2. Nf3 (2. c3)) 2. Qh5 $1\n'
+               'Nc6 ; rest of line\n3.Bc4 Nf6?? 4. Qxf7# 1-0\n\n'
+               '[White "B"]\n\n1. d4 d5 *\n')
+
+        games = list(read_games(io.StringIO(pgn)))
+
+        self.assertEqual(2, len(games))
+        tags, san_moves, result = games[0]
+        self.assertEqual('A', tags['White'])
+        self.assertListEqual(
+            ['e4', 'e5', 'Qh5', 'Nc6', 'Bc4', 'Nf6??', 'Qxf7#'], san_moves)
+        self.assertEqual('1-0', result)
+        self.assertEqual((['d4', 'd5'], '*'), games[1][1:])
+
+    def test_read_games_RoundTrip(self):
+        san_moves = ['f3', 'e5', 'g4', 'Qh4#']
+        pgn = format_game({'White': 'A'}, san_moves, '0-1')
+
+        games = list(read_games(io.StringIO(pgn)))
+
+        self.assertEqual(1, len(games))
+        self.assertEqual((san_moves, '0-1'), games[0][1:])
+
+    def test_get_batches_ShortLastBatch(self):
+        batches = list(get_batches(range(0, 5), 2))
+
+        self.assertListEqual([[0, 1], [2, 3], [4]], batches)
+
+    def test_map_batches_InThisProcess(self):
+        results = list(map_batches(sum, range(0, 5), 2, workers=0))
+
+        self.assertListEqual([1, 5, 4], results)
+
+    def test_map_batches_ResultsInOrder(self):
+        results = list(map_batches(sum, range(0, 20), 3, workers=2,
+                                   args=(100,)))
+
+        self.assertListEqual([103, 112, 121, 130, 139, 148, 137], results)
+
+
+if __name__ == '__main__':
+    unittest.main()
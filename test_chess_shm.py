@@ -0,0 +1,121 @@
+from concurrent.futures import ProcessPoolExecutor
+import unittest
+
+from chess_logic import *
+from chess_shm import BoardPool, SharedBoards
+
+
+def _count_moves(name, slot_count, index):
+    boards = SharedBoards(name, slot_count)
+    try:
+        board, colour = boards.read(index)
+        return len(board.get_legal_moves(colour))
+    finally:
+        boards.close()
+
+
+def _play_first_move(name, slot_count, index):
+    boards = SharedBoards(name, slot_count)
+    try:
+        board, colour = boards.read(index)
+        board.make_move(board.get_legal_moves(colour)[0])
+        boards.write(index, board, colour.opponent())
+    finally:
+        boards.close()
+
+
+class BoardPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = BoardPool(slot_count=4)  # Class Under Test
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_allocate_UntilFull(self):
+        indexes = [self.pool.allocate() for _ in range(0, 4)]
+
+        self.assertListEqual([0, 1, 2, 3], indexes)
+        self.assertIsNone(self.pool.allocate())
+
+    def test_free_SlotReused(self):
+        self.pool.allocate()
+        index = self.pool.allocate()
+        self.pool.free(index)
+
+        self.assertEqual(index, self.pool.allocate())
+        self.assertEqual(2, self.pool.get_free_count())
+
+    def test_free_AlreadyFree(self):
+        index = self.pool.allocate()
+
+        self.assertTrue(self.pool.free(index))
+        self.assertFalse(self.pool.free(index))
+        self.assertFalse(self.pool.free(3))
+        self.assertEqual(4, self.pool.get_free_count())
+
+    def test_free_OutOfRange(self):
+        self.pool.allocate()
+
+        self.assertFalse(self.pool.free(4))
+        self.assertFalse(self.pool.free(-1))
+        self.assertEqual(3, self.pool.get_free_count())
+
+    def test_write_OutOfRange(self):
+        with self.assertRaises(IndexError):
+            self.pool.write(4, ChessBoard(), Colour.WHITE)
+        with self.assertRaises(IndexError):
+            self.pool.read(-1)
+        with self.assertRaises(IndexError):
+            self.pool.get_codes(4)
+
+    def test_read_RoundTrip(self):
+        board = ChessBoard()
+        board.make_move(encode_move((6, 0), (5, 2)))
+        index = self.pool.put(board, Colour.BLACK)
+
+        copy, colour = self.pool.read(index)
+
+        self.assertEqual(board.hash, copy.hash)
+        self.assertIs(Colour.BLACK, colour)
+        self.assertEqual(encode_move((6, 0), (5, 2)), copy.get_last_move())
+
+    def test_read_EnPassant(self):
+        board = ChessBoard(layout='blank')
+        board.add_piece(Pawn((4, 4), Colour.WHITE))
+        board.add_piece(Pawn((3, 6), Colour.BLACK))
+        board.make_move(encode_move((3, 6), (3, 4)))
+        index = self.pool.put(board, Colour.WHITE)
+
+        copy, colour = self.pool.read(index)
+
+        self.assertNotEqual(NO_MOVE, copy.find_move((4, 4), (3, 5)))
+
+    def test_get_codes_InPlace(self):
+        index = self.pool.put(ChessBoard(), Colour.WHITE)
+        codes = self.pool.get_codes(index)
+        try:
+            self.assertEqual(encode_board(ChessBoard()), bytes(codes))
+        finally:
+            codes.release()
+
+    def test_read_OtherProcess(self):
+        board = ChessBoard()
+        white = self.pool.put(board, Colour.WHITE)
+        board.make_move(encode_move((4, 1), (4, 3)))
+        black = self.pool.put(board, Colour.BLACK)
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            counts = list(executor.map(
+                _count_moves, [self.pool.name] * 2, [4, 4], [white, black]))
+            executor.submit(_play_first_move, self.pool.name, 4,
+                            white).result()
+
+        self.assertListEqual([20, 20], counts)
+        moved, colour = self.pool.read(white)
+        self.assertIs(Colour.BLACK, colour)
+        self.assertNotEqual(ChessBoard().hash, moved.hash)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import io
+import math
+import unittest
+
+from chess_engine import ChessEngine
+from chess_logic import Colour, encode_move
+from chess_tournament import (
+    BLACK_WIN, DRAW, WHITE_WIN, Sprt, Tournament, TournamentResult,
+    play_game)
+
+
+def make_result(wins, draws, losses):
+    result = TournamentResult()
+    for score, count in [(1, wins), (0.5, draws), (0, losses)]:
+        for _ in range(count):
+            result.add(score)
+    return result
+
+
+class TournamentResultTests(unittest.TestCase):
+
+    def test_get_elo_Even(self):
+        result = make_result(10, 10, 10)
+        self.assertAlmostEqual(0, result.get_elo())
+
+    def test_get_elo_Stronger(self):
+        # 75% score is about +191 Elo
+        result = make_result(60, 30, 10)
+        self.assertAlmostEqual(190.85, result.get_elo(), places=1)
+
+    def test_get_elo_interval_ContainsEstimate(self):
+        result = make_result(60, 30, 10)
+        low, high = result.get_elo_interval()
+        self.assertLess(low, result.get_elo())
+        self.assertGreater(high, result.get_elo())
+
+    def test_get_elo_AllWins(self):
+        result = make_result(5, 0, 0)
+        self.assertEqual(math.inf, result.get_elo())
+
+
+class SprtTests(unittest.TestCase):
+
+    def test_get_decision_Undecided(self):
+        sprt = Sprt(0, 10)
+        self.assertIsNone(sprt.get_decision(make_result(3, 4, 3)))
+
+    def test_get_decision_AcceptsH1(self):
+        sprt = Sprt(0, 10)
+        self.assertEqual(
+            Sprt.H1, sprt.get_decision(make_result(600, 200, 200)))
+
+    def test_get_decision_AcceptsH0(self):
+        sprt = Sprt(0, 10)
+        self.assertEqual(
+            Sprt.H0, sprt.get_decision(make_result(200, 200, 600)))
+
+
+class TournamentTests(unittest.TestCase):
+
+    def test_play_game_ReturnsResultAndMoves(self):
+        result, san_moves = play_game(
+            ChessEngine(depth=1), ChessEngine(depth=1), max_plies=6)
+
+        self.assertIn(result, [WHITE_WIN, BLACK_WIN, DRAW])
+        self.assertEqual(6, len(san_moves))
+
+    def test_run_StreamsPgn(self):
+        pgn_stream = io.StringIO()
+        tournament = Tournament(
+            ChessEngine(depth=1), ChessEngine(depth=1), games=2,
+            concurrency=2, pgn_stream=pgn_stream, max_plies=4)
+
+        result = tournament.run()
+
+        self.assertEqual(2, result.get_game_count())
+        self.assertEqual(2, pgn_stream.getvalue().count('[Event '))
+
+    def test_run_StopsOnceSprtDecides(self):
+        tournament = Tournament(
+            _FoolsMateWinner(), _FoolsMateLoser(), games=1000,
+            concurrency=2, sprt=Sprt(0, 10), opening_plies=0)
+
+        result = tournament.run()
+
+        self.assertEqual(Sprt.H1, tournament.decision)
+        self.assertLess(result.get_game_count(), 50)
+        self.assertEqual(0, result.losses)
+
+
+class _ScriptedEngine(object):
+    """
+    Plays a fixed line for each colour, indexed by ply.
+    """
+    scripts = {}
+
+    def choose_move(self, board, colour):
+        return encode_move(*self.scripts[colour][len(board.move_list)])
+
+
+class _FoolsMateWinner(_ScriptedEngine):
+    scripts = {
+        Colour.WHITE: {0: ((4, 1), (4, 3)), 2: ((3, 1), (3, 3)),
+                       4: ((3, 0), (7, 4))},
+        Colour.BLACK: {1: ((4, 6), (4, 4)), 3: ((3, 7), (7, 3))}}
+
+
+class _FoolsMateLoser(_ScriptedEngine):
+    scripts = {
+        Colour.WHITE: {0: ((5, 1), (5, 2)), 2: ((6, 1), (6, 3))},
+        Colour.BLACK: {1: ((5, 6), (5, 5)), 3: ((6, 6), (6, 4))}}
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import io
+import threading
+import time
+import unittest
+
+from chess_engine import ChessEngine
+from chess_logic import *
+from chess_uci import (
+    START_FEN, TimeManager, UciEngine, board_from_fen, format_uci_move,
+    parse_uci_move)
+
+
+class _LineCollector(io.StringIO):
+    """
+    Output stream that lets a test wait for a line to appear.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.__written = threading.Condition()
+
+    def write(self, text):
+        with self.__written:
+            result = super().write(text)
+            self.__written.notify_all()
+        return result
+
+    def wait_for(self, prefix, timeout=10):
+        deadline = time.monotonic() + timeout
+        with self.__written:
+            while True:
+                for line in self.getvalue().splitlines():
+                    if line.startswith(prefix):
+                        return line
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.__written.wait(remaining)
+
+
+class FenTests(unittest.TestCase):
+
+    def test_board_from_fen_StartPosition(self):
+        board, colour = board_from_fen(START_FEN)
+        self.assertEqual(ChessBoard().hash, board.hash)
+        self.assertIs(Colour.WHITE, colour)
+
+    def test_board_from_fen_EnPassantSquare(self):
+        board, colour = board_from_fen(
+            'rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 3')
+        self.assertIs(Colour.BLACK, colour)
+        self.assertNotEqual(NO_MOVE, parse_uci_move(board, 'd4e3'))
+
+    def test_parse_uci_move_Promotion(self):
+        board, _ = board_from_fen('8/P6k/8/8/8/8/8/K7 w - - 0 1')
+        move = parse_uci_move(board, 'a7a8n')
+        self.assertIs(Knight, get_move_promotion(move))
+        self.assertEqual('a7a8n', format_uci_move(move))
+
+    def test_parse_uci_move_Illegal(self):
+        board, _ = board_from_fen(START_FEN)
+        self.assertEqual(NO_MOVE, parse_uci_move(board, 'e2e5'))
+
+    def test_format_uci_move_NoMove(self):
+        self.assertEqual('0000', format_uci_move(NO_MOVE))
+
+
+class TimeManagerTests(unittest.TestCase):
+
+    def test_allocate_SoftWithinHard(self):
+        soft, hard = TimeManager().allocate(60000, 1000)
+        self.assertTrue(0 < soft < hard < 60000)
+
+    def test_allocate_LowOnTime(self):
+        soft, hard = TimeManager().allocate(100, 0, moves_to_go=1)
+        self.assertTrue(soft <= hard <= 100)
+
+
+class UciEngineTests(unittest.TestCase):
+
+    def setUp(self):
+        self.output = _LineCollector()
+        self.uci = UciEngine(ChessEngine(), io.StringIO(),
+                             self.output)  # Class Under Test
+
+    def tearDown(self):
+        self.uci.handle_command('stop')
+
+    def test_handle_command_Handshake(self):
+        self.uci.handle_command('uci')
+        self.uci.handle_command('isready')
+        lines = self.output.getvalue().splitlines()
+        self.assertEqual('uciok', lines[-2])
+        self.assertEqual('readyok', lines[-1])
+
+    def test_handle_command_Quit(self):
+        self.assertFalse(self.uci.handle_command('quit'))
+
+    def test_handle_command_GoDepth(self):
+        self.uci.handle_command('position startpos moves e2e4 e7e5')
+        self.uci.handle_command('go depth 1')
+        line = self.output.wait_for('bestmove')
+        self.assertIsNotNone(line)
+        self.assertIn('info depth 1 ', self.output.getvalue())
+
+    def test_handle_command_FindsMate(self):
+        self.uci.handle_command(
+            'position fen 6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+        self.uci.handle_command('go depth 2')
+        self.assertEqual('bestmove a1a8', self.output.wait_for('bestmove'))
+        self.assertIn('score mate 1', self.output.getvalue())
+
+    def test_handle_command_InfiniteHeldUntilStop(self):
+        self.uci.handle_command('position startpos')
+        self.uci.handle_command('go infinite')
+        time.sleep(0.05)
+        self.assertNotIn('bestmove', self.output.getvalue())
+
+        start = time.monotonic()
+        self.uci.handle_command('stop')
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertIsNotNone(self.output.wait_for('bestmove', timeout=0))
+
+    def test_handle_command_PonderHit(self):
+        self.uci.handle_command('position startpos')
+        self.uci.handle_command('go ponder wtime 2000 btime 2000')
+        time.sleep(0.05)
+        self.assertNotIn('bestmove', self.output.getvalue())
+
+        self.uci.handle_command('ponderhit')
+        self.assertIsNotNone(self.output.wait_for('bestmove', timeout=5))
+
+    def test_handle_command_IllegalPositionMove(self):
+        self.uci.handle_command(
+            'position fen r3k3/8/8/8/8/8/8/4K3 b q - 0 1 moves e8c8')
+        self.uci.handle_command('go depth 1')
+        self.assertEqual('bestmove 0000', self.output.wait_for('bestmove'))
+        self.assertIn('info string illegal move e8c8',
+                      self.output.getvalue())
+
+    def test_handle_command_ValidPositionAfterIllegal(self):
+        self.uci.handle_command('position startpos moves e1g1')
+        self.uci.handle_command('position startpos moves e2e4')
+        self.uci.handle_command('go depth 1')
+        self.assertNotEqual('bestmove 0000',
+                            self.output.wait_for('bestmove'))
+
+    def test_run_QuitEndsLoop(self):
+        uci = UciEngine(ChessEngine(), io.StringIO('uci\nquit\nisready\n'),
+                        self.output)
+        uci.run()
+        self.assertNotIn('readyok', self.output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()